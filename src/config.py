@@ -18,6 +18,17 @@ class Config:
     SAMPLE_RATE = 16000
     CHANNELS = 1
     CHUNK_SIZE = 1024
+    RECORD_BUFFER_SECONDS = 30  # Initial preallocation per utterance; grows if exceeded
+    # Keep the microphone stream open between utterances and prepend the last PREROLL_MS
+    # of audio to each recording, so the first syllable is never lost to device open latency.
+    # Note: the microphone stays in use (audio is only kept in a small in-memory ring).
+    ALWAYS_ON_CAPTURE = False
+    PREROLL_MS = 400
+    # PortAudio callback -> consumer handoff: chunks in flight before audio is dropped (~4 s at 1024)
+    CAPTURE_RING_CHUNKS = 64
+    CAPTURE_LATE_MS = 200    # Chunks handled later than this after capture count as late frames
+    # Audio is handed to the STT provider in memory; set True to also keep a WAV per utterance in TEMP_DIR
+    SAVE_DEBUG_AUDIO = False
     
     # STT Provider Settings
     # Options: "whisper", "sensevoice", "volcengine"
@@ -25,10 +36,49 @@ class Config:
     
     # --- Whisper Settings ---
     # Options: "tiny", "base", "small", "medium", "large-v3"
-    # Distilled (Fast & Accurate): "Systran/faster-distil-whisper-large-v3"
+    # Distilled (Fast & Accurate, English only): "Systran/faster-distil-whisper-large-v3"
     MODEL_SIZE = "small"
     DEVICE = "cpu"           # cpu or cuda
     LANGUAGE = None          # None = Auto-detect language
+    WHISPER_NUM_WORKERS = 1  # Parallel transcriptions on one loaded model
+    WHISPER_CPU_THREADS = 0  # Threads per worker; 0 = CTranslate2 default (or cores / workers when > 1 worker)
+    WHISPER_COMPUTE_TYPE = None         # None = int8 on CPU, float16 on CUDA
+    WHISPER_BEAM_SIZE = 5
+    WHISPER_WITHOUT_TIMESTAMPS = False
+    # Apply the per-machine calibration from `python src/main.py --tune-whisper` (CPU only).
+    # It overrides MODEL_SIZE, compute type, threads, beam size and timestamps.
+    WHISPER_AUTOTUNE = True
+    WHISPER_TUNE_TARGET_RTF = 0.3       # Calibration: slowest acceptable real-time factor...
+    WHISPER_TUNE_MIN_ACCURACY = 0.9     # ...and lowest acceptable 1 - CER against the reference
+
+    # --- Cascade (two-tier) Whisper ---
+    # Inject the CASCADE_FAST_MODEL result at once and re-transcribe with MODEL_SIZE in the background.
+    # The accurate text replaces the injected one only if it differs in more than punctuation, arrives
+    # within CASCADE_CORRECTION_WINDOW seconds, and the same window is focused with nothing typed since
+    # (Windows only); otherwise it is written to HISTORY_FILE.
+    CASCADE_ENABLED = False
+    CASCADE_FAST_MODEL = "base"
+    CASCADE_CORRECTION_WINDOW = 10
+
+    # --- Long-form Dictation ---
+    # Recordings longer than LONGFORM_MIN_SECONDS are cut at pauses into overlapping chunks
+    # that are transcribed in parallel. SenseVoice batches them (SENSEVOICE_BATCH_SIZE at a time).
+    # Whisper runs them on the loaded model's workers, so it needs WHISPER_NUM_WORKERS > 1
+    # (which splits the cores between workers for every decode). It applies to whole
+    # utterances and, with streaming on, to audio still undecoded when the hotkey is released.
+    LONGFORM_ENABLED = True
+    LONGFORM_MIN_SECONDS = 45
+    LONGFORM_CHUNK_SECONDS = 20
+    LONGFORM_OVERLAP_SECONDS = 1.0
+
+    # --- Streaming Settings ---
+    # Decode audio while the hotkey is still held so release only flushes the tail
+    STREAMING_ENABLED = True
+    STREAM_WINDOW_SECONDS = 15.0   # Whisper: max audio decoded per sliding-window pass
+    STREAM_STEP_SECONDS = 2.0      # Whisper: new audio required before re-decoding
+    STREAM_TAIL_SECONDS = 1.5      # Whisper: segments ending this close to the live edge stay tentative
+    STREAM_SEGMENT_SECONDS = 8.0   # Volcengine: send a pause-aligned segment once this much audio is pending
+    PARTIAL_RESULTS_ENABLED = True # Show the running hypothesis in the listening bar while recording
 
     # --- Volcengine (Doubao) Settings ---
     # To use this, set STT_PROVIDER = "volcengine"
@@ -37,10 +87,87 @@ class Config:
     VOLC_SECRET_KEY = os.getenv("VOLC_SECRET_KEY")
     # Default cluster for ASR
     VOLC_CLUSTER = "volc.bigasr.auc" 
+    VOLC_FLASH_URL = "https://openspeech.bytedance.com/api/v3/auc/bigmodel/recognize/flash"
+    # Streaming mode while the hotkey is held: "websocket" (live recognition) or "flash" (segmented uploads)
+    VOLC_STREAMING_MODE = "websocket"
+    VOLC_WS_URL = "wss://openspeech.bytedance.com/api/v3/sauc/bigmodel"
+    VOLC_WS_RESOURCE_ID = "volc.bigasr.sauc.duration"
+    VOLC_WS_FINAL_TIMEOUT = 5  # Seconds to wait for the final result after release
+    # Upload codec for the Flash API: "wav" (no encoding cost), "flac" (lossless, ~2x smaller)
+    # or "ogg_opus" (~10x smaller). FLAC/Opus need the soundfile package.
+    VOLC_UPLOAD_CODEC = "wav"
+
+    # --- Voice Activity Detection ---
+    # Trims silence and skips STT for clips without speech, for every provider.
+    # Options: "energy", "silero" (models/silero_vad.onnx via onnxruntime), None to disable
+    VAD_ENGINE = "energy"
+    VAD_SILERO_MODEL = "silero_vad.onnx"
+    VAD_SILERO_THRESHOLD = 0.5
+    VAD_ENERGY_THRESHOLD = 0.004   # Minimum frame RMS (full scale = 1.0) counted as speech
+    VAD_MIN_SPEECH_MS = 200        # Less speech than this: skip STT entirely
+    VAD_PAD_MS = 200               # Silence kept around each speech region
+    VAD_MAX_SILENCE_MS = 300       # Internal pauses are shortened to this
+
+    # --- Text Injection ---
+    # "clipboard" (paste), "type" (keystrokes) or "auto" (keystrokes for short single-line text)
+    INJECT_MODE = "clipboard"
+    INJECT_TYPE_MAX_CHARS = 12
+    CLIPBOARD_VERIFY_TIMEOUT_MS = 100   # Max wait for the clipboard to show the new text
+    CLIPBOARD_POLL_MS = 5
+    CLIPBOARD_RESTORE_DELAY_MS = 500    # The user's clipboard comes back this long after the last paste
+    INJECT_ECHO_MS = 200                # Key events this soon after an injection are our own, not the user's
+
+    # --- Engine Startup ---
+    ENGINE_WARMUP = True          # Run a throwaway inference after loading so the first utterance is fast
+    ENGINE_LOAD_TIMEOUT = 180     # Seconds an utterance recorded during loading waits for the engine
+
+    # --- Latency Tracing ---
+    # Per-utterance stage timestamps, appended to TRACE_FILE as JSON lines
+    TRACE_ENABLED = True
+    TRACE_KEEP = 500                 # Recent traces kept in memory for the tray latency report
+    TRACE_MAX_BYTES = 5 * 1024 * 1024  # TRACE_FILE is rotated to TRACE_FILE + ".1" past this size
+    STARTUP_BUDGET_MS = 800          # Warn if launch-to-hotkey-ready takes longer
+
+    # --- Thread Scheduling ---
+    # Keep capture, hotkeys and the UI responsive while a model decodes: inference threads run at
+    # lowered OS priority on INFERENCE_CORES; capture and hotkey threads at raised priority on the rest.
+    # With STT_SERVER_ENABLED the policy covers the whole server process (and its native thread pools).
+    SCHEDULING_ENABLED = True
+    INFERENCE_CORES = None           # e.g. [2, 3, 4, 5]; None = all but the first RESERVED_CORES (3+ cores)
+    RESERVED_CORES = 1               # Cores kept free of inference for capture/hotkey/UI
+
+    # --- Job Scheduling ---
+    SCHEDULER_MAX_WORKERS = 1        # Utterances transcribed concurrently; results are always injected in order
+    SCHEDULER_REPLACE_PENDING = False  # A new utterance cancels older ones that have not been injected yet
+    COALESCE_MAX_SECONDS = 6.0       # Queued utterances shorter than this (combined) may be merged...
+    COALESCE_GAP_SECONDS = 1.0       # ...if the next one started within this many seconds of the previous release
+    # Merging cancels the utterances' streaming sessions: the merged audio is transcribed in one pass
+
+    # --- Transcription Server Settings ---
+    # Run the STT engine in a separate long-lived process that keeps the model warm.
+    # It can be shared by several clients and survives app restarts.
+    STT_SERVER_ENABLED = False
+    STT_SERVER_AUTOSTART = True           # Spawn the server if none is listening
+    STT_SERVER_ADDRESS = ("127.0.0.1", 47821)
+    # Shared secret for the server socket (at least 32 characters). Unset = a random per-user key generated on first run
+    # and kept in STT_SERVER_KEY_FILE (readable only by the current user)
+    STT_SERVER_AUTHKEY = os.getenv("AIINPUT_SERVER_KEY", "").encode("utf-8") or None
+    STT_SERVER_KEY_FILE = os.path.join(os.path.expanduser("~"), ".aiinput", "server.key")
+    STT_SERVER_START_TIMEOUT = 60         # Seconds to wait for a spawned server to load its model
 
     # --- SenseVoice Settings ---
-    # Coming soon in local implementation
+    # FunASR ONNX export of iic/SenseVoiceSmall under models/<SENSEVOICE_MODEL_DIR>:
+    # model_quant.onnx (or model.onnx), am.mvn, tokens.json
+    SENSEVOICE_MODEL_DIR = "sensevoice"
+    SENSEVOICE_LANGUAGE = "auto"     # auto, zh, en, yue, ja, ko
+    SENSEVOICE_USE_ITN = True        # Punctuation and inverse text normalization
+    SENSEVOICE_THREADS = None        # ONNX Runtime intra-op threads (None = half the cores, max 4)
+    SENSEVOICE_BATCH_SIZE = 4        # Max utterances decoded in one run
+    SENSEVOICE_BATCH_WAIT_MS = 20    # How long the first queued utterance waits for others
     
+    # Refiner engine: "llm" (Ollama, see LLM_*) or "rules" (local filler-word remover, no network)
+    REFINER_ENGINE = "llm"
+
     # LLM Settings
     LLM_ENABLED = False
     LLM_MODEL = "qwen2:1.5b"
@@ -54,6 +181,33 @@ class Config:
 4. 只返回处理后的结果文本。
 
 文本输入："""
+    LLM_STREAMING = True             # Consume Ollama's NDJSON token stream
+    LLM_LATENCY_BUDGET_MS = 1500     # Inject the raw transcript if refinement takes longer than this
+    # Local filler-word filter (same words as LLM_PROMPT). Interjections are always safe to drop;
+    # the ambiguous ones can be real words, so their presence still sends the text to the LLM.
+    LLM_LOCAL_FILTER = True
+    FILLER_INTERJECTIONS = ["嗯", "啊", "呃"]
+    FILLER_PHRASES = ["那个什么", "那个", "就是", "然后"]
+
+    # --- Result Caches ---
+    # Refinements keyed by normalized text + prompt/model. (Transcripts are not cached: a new
+    # recording of the same phrase never has the same samples.)
+    CACHE_ENABLED = True
+    CACHE_PERSIST = False             # Keep caches on disk under CACHE_DIR across restarts (append-only journal)
+    REFINE_CACHE_MAX_BYTES = 1024 * 1024
+
+    # --- HTTP Settings (shared keep-alive pool for Volcengine and the LLM) ---
+    HTTP_POOL_SIZE = 4
+    HTTP_RETRIES = 2          # Connect errors and 429/502/503/504 responses
+    HTTP_BACKOFF = 0.2        # Seconds, doubled on each retry
+    HTTP_PREWARM = True       # Open connections when the hotkey is pressed
+    # (connect, read) timeouts in seconds per endpoint
+    HTTP_TIMEOUTS = {
+        "default": (3, 30),
+        "volc_flash": (3, 30),
+        "llm": (2, 10),
+        "prewarm": (3, 3),
+    }
 
     # Paths
     if getattr(sys, 'frozen', False):
@@ -65,6 +219,10 @@ class Config:
     
     TEMP_DIR = os.path.join(BASE_DIR, "temp")
     LOG_FILE = os.path.join(BASE_DIR, "app.log")
+    CACHE_DIR = os.path.join(BASE_DIR, "cache")
+    TRACE_FILE = os.path.join(BASE_DIR, "traces.jsonl")
+    HISTORY_FILE = os.path.join(BASE_DIR, "history.jsonl")
+    WHISPER_TUNING_FILE = os.path.join(BASE_DIR, "models", "whisper_tuning.json")
 
     @staticmethod
     def ensure_dirs():
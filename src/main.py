@@ -1,14 +1,10 @@
 import sys
 import os
+import time
 import traceback
 from datetime import datetime
 
-# CRITICAL: Import onnxruntime BEFORE PyQt5 to prevent DLL conflicts (e.g. vcruntime140.dll)
-# This must happen before any PyQt5 imports
-try:
-    import onnxruntime
-except ImportError:
-    pass
+STARTUP_T0 = time.perf_counter()
 
 # CRITICAL: Setup global exception handler immediately to catch import errors
 def handle_exception(exc_type, exc_value, exc_traceback):
@@ -33,29 +29,43 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 
 sys.excepthook = handle_exception
 
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import QObject, pyqtSignal
-
 # Add project root to sys.path to allow imports from src
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(current_dir)
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+# Opt-in import timing (AIINPUT_IMPORT_PROFILE=1); must come before the imports it measures
+from src.utils.import_profiler import profiler
+from src.config import config
 
+# CRITICAL: Import onnxruntime BEFORE PyQt5 to prevent DLL conflicts (e.g. vcruntime140.dll)
+# Only when an in-process ONNX engine is configured; it is a large import otherwise wasted at startup
+if (config.STT_PROVIDER == "sensevoice" and not config.STT_SERVER_ENABLED) or config.VAD_ENGINE == "silero":
+    try:
+        import onnxruntime
+    except ImportError:
+        pass
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QObject, pyqtSignal
 
 # Imports with logging available (handled by excepthook)
+# STT engines, the LLM client and optional providers are imported later, on first use
 from src.services.hotkey_manager import HotkeyManager
 from src.ui.tray_icon import TrayIcon
 from src.ui.listening_bar import ListeningBar
 from src.utils.logger import logger
+from src.utils.scheduling import apply_role, UI
 
 class AppSignals(QObject):
     """Signals to communicate from background threads to UI"""
     show_bar = pyqtSignal()
     hide_bar = pyqtSignal()
     update_level = pyqtSignal(float)
+    update_partial = pyqtSignal(str)
     update_tray = pyqtSignal(bool)
+    update_engine = pyqtSignal(str)
 
 def main():
     if sys.platform.startswith('win'):
@@ -63,6 +73,8 @@ def main():
         multiprocessing.freeze_support()
 
     app = QApplication(sys.argv)
+    # Main thread: Qt event loop and listening bar repaints
+    apply_role(UI)
     # Ensure app doesn't exit when window is hidden
     app.setQuitOnLastWindowClosed(False)
     
@@ -76,6 +88,7 @@ def main():
     signals.show_bar.connect(listening_bar.show_bar)
     signals.hide_bar.connect(listening_bar.hide_bar)
     signals.update_level.connect(listening_bar.update_audio_level)
+    signals.update_partial.connect(listening_bar.update_partial_text)
     
     # We'll initialize tray later to pass the manager
     
@@ -91,20 +104,47 @@ def main():
     def on_audio_level(level):
         signals.update_level.emit(level)
 
+    def on_partial_text(text):
+        signals.update_partial.emit(text)
+
+    def on_engine_state(state):
+        signals.update_engine.emit(state)
+
     manager = HotkeyManager(
         on_recording_start=on_start, 
         on_recording_stop=on_stop,
-        on_audio_level=on_audio_level
+        on_audio_level=on_audio_level,
+        on_partial_text=on_partial_text,
+        on_engine_state=on_engine_state
     )
     
     tray = TrayIcon(manager, listening_bar)
     signals.update_tray.connect(tray.update_status)
+    signals.update_engine.connect(tray.update_engine_state)
+    # Changes before the connection above were not delivered; later ones queue behind this
+    tray.update_engine_state(manager.engine.state)
     
     # Start listening
     manager.start_listening()
+
+    ready_ms = (time.perf_counter() - STARTUP_T0) * 1000
+    logger.info(f"Hotkey ready {ready_ms:.0f} ms after launch (STT engine loading in background).")
+    if profiler:
+        logger.info(profiler.report())
+    elif ready_ms > config.STARTUP_BUDGET_MS:
+        logger.warning(f"Startup exceeded its {config.STARTUP_BUDGET_MS} ms budget; "
+                       f"run with AIINPUT_IMPORT_PROFILE=1 for an import-time report.")
     
     logger.info("Application started. Unified UI loop running.")
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    if "--stt-server" in sys.argv:
+        # Headless transcription server mode (see src/services/transcription_server.py)
+        from src.services.transcription_server import main as server_main
+        sys.exit(server_main(sys.argv[1:]))
+    if "--tune-whisper" in sys.argv:
+        # One-time Whisper calibration for this machine (see src/services/whisper_tuner.py)
+        from src.services.whisper_tuner import main as tuner_main
+        sys.exit(tuner_main(sys.argv[1:]))
     main()
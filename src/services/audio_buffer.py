@@ -0,0 +1,88 @@
+import numpy as np
+
+class AudioRingBuffer:
+    """
+    Preallocated int16 sample store for the recorder.
+
+    growable=True  keeps every sample (capacity doubles when full) and exposes them
+                   as a zero-copy view, which is what an utterance needs.
+    growable=False is a fixed-capacity ring that overwrites the oldest samples,
+                   which is what a bounded pre-roll needs.
+    Chunks are copied straight into the preallocated array, and levels are computed
+    in a reusable scratch buffer, so steady-state capture does no per-chunk buffer allocations.
+    """
+    def __init__(self, capacity, growable=True):
+        self.growable = growable
+        self._data = np.empty(max(1, int(capacity)), dtype=np.int16)
+        self._scratch = np.empty(0, dtype=np.float32)
+        self._written = 0
+
+    @property
+    def capacity(self):
+        return len(self._data)
+
+    def __len__(self):
+        return self._written if self.growable else min(self._written, self.capacity)
+
+    def clear(self):
+        self._written = 0
+
+    def write(self, data):
+        """Append raw int16 PCM bytes (or an int16 array). Returns the chunk as an int16 array."""
+        chunk = np.frombuffer(data, dtype=np.int16) if not isinstance(data, np.ndarray) else data
+        n = len(chunk)
+        if self.growable:
+            self._reserve(self._written + n)
+            start = self._written
+            self._data[start:start + n] = chunk
+            self._written += n
+            return self._data[start:start + n]
+
+        cap = self.capacity
+        if n >= cap:
+            self._data[:] = chunk[-cap:]
+            # The ring now starts at index 0: keep _written a multiple of cap so view() does not rotate it
+            self._written = (self._written + n) // cap * cap
+            return chunk
+        pos = self._written % cap
+        first = min(n, cap - pos)
+        self._data[pos:pos + first] = chunk[:first]
+        if first < n:
+            self._data[:n - first] = chunk[first:]
+        self._written += n
+        return chunk
+
+    def level(self, chunk):
+        """Mean absolute amplitude of `chunk` in [0, 1], computed without temporary arrays."""
+        n = len(chunk)
+        if n == 0:
+            return 0.0
+        if len(self._scratch) < n:
+            self._scratch = np.empty(n, dtype=np.float32)
+        scratch = self._scratch[:n]
+        np.copyto(scratch, chunk)
+        np.abs(scratch, out=scratch)
+        return float(scratch.sum()) / n / 32768.0
+
+    def view(self):
+        """
+        Samples in chronological order.
+        Zero-copy for growable buffers; fixed rings return an ordered copy once wrapped.
+        """
+        if self.growable:
+            return self._data[:self._written]
+        cap = self.capacity
+        if self._written <= cap:
+            return self._data[:self._written]
+        pos = self._written % cap
+        return np.concatenate([self._data[pos:], self._data[:pos]])
+
+    def _reserve(self, needed):
+        if needed <= self.capacity:
+            return
+        new_capacity = self.capacity
+        while new_capacity < needed:
+            new_capacity *= 2
+        grown = np.empty(new_capacity, dtype=np.int16)
+        grown[:self._written] = self._data[:self._written]
+        self._data = grown
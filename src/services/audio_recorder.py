@@ -1,96 +1,282 @@
 import pyaudio
-import wave
 import threading
+import time
 import os
 import numpy as np
+from datetime import datetime
 from src.config import config
 from src.utils.logger import logger
+from src.utils.audio import save_wav
+from src.services.audio_buffer import AudioRingBuffer
+from src.utils.tracing import NULL_TRACE
+from src.utils.scheduling import apply_role, CAPTURE
 
 class AudioRecorder:
+    """
+    Microphone capture into an AudioRingBuffer.
+    With ALWAYS_ON_CAPTURE the input stream stays open between utterances and the
+    most recent PREROLL_MS of audio is kept in a small ring, which is spliced in
+    front of the live audio when recording starts.
+
+    PyAudio runs in callback mode. The callback only copies each chunk into the next
+    slot of a preallocated ring and bumps a counter; it never takes a lock or waits.
+    A consumer thread moves slots into the utterance buffer and feeds listeners.
+    Audio lost on the way is counted per utterance: frames the device dropped
+    (overflow / gaps in the ADC timeline), frames discarded because the ring was full,
+    and frames the consumer handled more than CAPTURE_LATE_MS after capture.
+    """
     def __init__(self, on_audio_level=None):
-        self.frames = []
+        self.buffer = self._new_buffer()
+        self.preroll = AudioRingBuffer(config.SAMPLE_RATE * config.PREROLL_MS // 1000, growable=False)
         self.is_recording = False
         self.audio = pyaudio.PyAudio()
         self.stream = None
         self.on_audio_level = on_audio_level
-        self._lock = threading.Lock()
+        self.on_chunk = None
+        self.trace = NULL_TRACE
+        self._lock = threading.Lock()        # Recording state (never taken by the callback)
+        self._drain_lock = threading.Lock()  # One consumer at a time
+
+        # Single-producer / single-consumer handoff from the PortAudio callback
+        self._slots = np.zeros((config.CAPTURE_RING_CHUNKS, config.CHUNK_SIZE), dtype=np.int16)
+        self._slot_frames = np.zeros(config.CAPTURE_RING_CHUNKS, dtype=np.int64)
+        self._slot_stamps = np.zeros(config.CAPTURE_RING_CHUNKS, dtype=np.float64)
+        self._produced = 0   # Written by the callback only
+        self._consumed = 0   # Written by the consumer only
+        self._ready = threading.Event()
+        self._next_adc_time = 0.0
+
+        # Cumulative counters; per-utterance figures are differences from a baseline
+        self.overflows = 0         # Callback reported paInputOverflow
+        self.dropped_frames = 0    # Lost before or at the handoff
+        self.late_frames = 0       # Consumed later than CAPTURE_LATE_MS
+        self.captured_frames = 0
+        self.max_delay_ms = 0.0
+        self.last_utterance_stats = None
+        self._baseline = None
+
+        if config.ALWAYS_ON_CAPTURE:
+            self.open_capture()
+
+    @property
+    def always_on(self):
+        return config.ALWAYS_ON_CAPTURE and self.stream is not None
+
+    def open_capture(self):
+        """Open the persistent input stream used by always-on capture."""
+        try:
+            with self._lock:
+                if self.stream:
+                    return
+                self.stream = self._open_stream()
+            threading.Thread(target=self._record_loop, args=(self.stream,), name="AudioCapture", daemon=True).start()
+            logger.info(f"Always-on capture opened ({config.PREROLL_MS} ms pre-roll).")
+        except Exception as e:
+            logger.error(f"Failed to open always-on capture, falling back to per-press streams: {e}")
 
-    def start_recording(self):
+    def close(self):
+        """Close the input stream (also ends always-on capture)."""
+        with self._lock:
+            self.is_recording = False
+            self._close_stream()
+
+    def start_recording(self, on_chunk=None, trace=NULL_TRACE):
         try:
             with self._lock:
                 if self.is_recording:
                     return
                 
-                self.frames = []
+                # A fresh buffer per utterance: the previous one may still be
+                # referenced by an array view that is being transcribed
+                self.buffer = self._new_buffer()
+                # Optional consumer for live chunks (e.g. a streaming transcription session).
+                # It gets int16 views of the buffer and must copy what it keeps.
+                self.on_chunk = on_chunk
+                self.trace = trace
+                self._baseline = self._counters()
+
+                if self.always_on:
+                    # Stream is already running: splice the pre-roll in front of the live audio
+                    preroll = self.preroll.view()
+                    self.buffer.write(preroll)
+                    if on_chunk and len(preroll):
+                        on_chunk(preroll)
+                    self.preroll.clear()
+                    self.is_recording = True
+                    trace.mark("stream_open")
+                    logger.debug(f"Recording started with {len(preroll) * 1000 // config.SAMPLE_RATE} ms pre-roll.")
+                    return
+
                 self.is_recording = True
-                
-                self.stream = self.audio.open(
-                    format=pyaudio.paInt16,
-                    channels=config.CHANNELS,
-                    rate=config.SAMPLE_RATE,
-                    input=True,
-                    frames_per_buffer=config.CHUNK_SIZE
-                )
+                self.stream = self._open_stream()
+                trace.mark("stream_open")
             
-            threading.Thread(target=self._record_loop, daemon=True).start()
+            threading.Thread(target=self._record_loop, args=(self.stream,), name="AudioCapture", daemon=True).start()
             logger.debug("Recording loop thread started.")
         except Exception as e:
             logger.error(f"Failed to start recording: {e}")
             self.is_recording = False
 
-    def _record_loop(self):
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        """PortAudio callback thread: copy the chunk into the next free slot. Never blocks."""
+        now = time.perf_counter()
+        if status & pyaudio.paInputOverflow:
+            self.overflows += 1
+        # A jump in the device timeline means frames were lost before reaching us
+        adc_time = time_info.get("input_buffer_adc_time", 0.0) if time_info else 0.0
+        if adc_time and self._next_adc_time:
+            gap = round((adc_time - self._next_adc_time) * config.SAMPLE_RATE)
+            if gap > config.CHUNK_SIZE // 2:
+                self.dropped_frames += gap
+        self._next_adc_time = adc_time + frame_count / config.SAMPLE_RATE if adc_time else 0.0
+
+        n_slots = len(self._slots)
+        if self._produced - self._consumed >= n_slots:
+            # Consumer is too far behind; the ring never blocks the device
+            self.dropped_frames += frame_count
+        else:
+            slot = self._produced % n_slots
+            n = min(frame_count, config.CHUNK_SIZE)
+            self._slots[slot, :n] = np.frombuffer(in_data, dtype=np.int16, count=n)
+            self._slot_frames[slot] = n
+            self._slot_stamps[slot] = now
+            self.dropped_frames += frame_count - n
+            self._produced += 1  # Publish the slot last
+        self._ready.set()
+        return (None, pyaudio.paContinue)
+
+    def _record_loop(self, stream):
+        apply_role(CAPTURE)
         try:
-            while self.is_recording:
-                with self._lock:
-                    if not self.stream:
-                        break
-                    try:
-                        data = self.stream.read(config.CHUNK_SIZE, exception_on_overflow=False)
-                        self.frames.append(data)
-                    except Exception as e:
-                        logger.error(f"Error reading audio stream: {e}")
-                        break
-                
-                # Calculate audio level for visualization
-                if self.on_audio_level:
-                    audio_data = np.frombuffer(data, dtype=np.int16)
-                    level = np.abs(audio_data).mean() / 32768.0
-                    level = min(1.0, level * 30)
-                    self.on_audio_level(level)
+            # Runs until this stream is closed or replaced
+            while self.stream is stream:
+                self._ready.wait(0.1)
+                self._ready.clear()
+                self._drain()
         except Exception as e:
             logger.error(f"Fatal error in _record_loop: {e}")
         finally:
             logger.debug("Recording loop exited.")
 
+    def _drain(self):
+        """Move every published slot into the utterance buffer (or the pre-roll) and notify listeners."""
+        with self._drain_lock:
+            while self._consumed < self._produced:
+                slot = self._consumed % len(self._slots)
+                chunk = self._slots[slot, :self._slot_frames[slot]]
+                delay_ms = (time.perf_counter() - float(self._slot_stamps[slot])) * 1000
+                with self._lock:
+                    recording = self.is_recording
+                    buffer = self.buffer if recording else self.preroll
+                    written = buffer.write(chunk)
+                    on_chunk = self.on_chunk
+                    trace = self.trace
+                self._consumed += 1  # The slot may be reused from here on
+                self.captured_frames += len(written)
+                self.max_delay_ms = max(self.max_delay_ms, delay_ms)
+                if delay_ms > config.CAPTURE_LATE_MS:
+                    self.late_frames += len(written)
+
+                if not recording:
+                    continue
+                trace.mark("first_chunk")
+
+                if on_chunk:
+                    on_chunk(written)
+
+                if self.on_audio_level:
+                    level = min(1.0, buffer.level(written) * 30)
+                    self.on_audio_level(level)
+
     def stop_recording(self):
         try:
             with self._lock:
                 if not self.is_recording:
                     return None
-                
+                if not self.always_on:
+                    # Returns once the last callback has run
+                    self._close_stream()
+                    logger.debug("Stream stopped and closed.")
+
+            # Everything captured up to the release belongs to this utterance
+            self._drain()
+            with self._lock:
                 self.is_recording = False
-                if self.stream:
-                    try:
-                        self.stream.stop_stream()
-                        self.stream.close()
-                    except Exception as e:
-                        logger.error(f"Error closing stream: {e}")
-                    self.stream = None
-            
-            logger.debug("Stream stopped and closed.")
-            return self._save_to_file()
+                self.on_chunk = None
+                trace, self.trace = self.trace, NULL_TRACE
+
+            stats = self._utterance_stats()
+            trace.annotate(**{f"capture_{key}": value for key, value in stats.items()})
+            if stats["dropped_frames"] or stats["late_frames"]:
+                logger.warning(f"Capture lost audio: {stats['dropped_frames']} dropped, "
+                               f"{stats['late_frames']} late of {stats['frames']} frames "
+                               f"({stats['overflows']} overflows).")
+
+            # Zero-copy int16 view over the recorded samples
+            samples = self.buffer.view()
+            if config.SAVE_DEBUG_AUDIO:
+                self._save_to_file(samples)
+                trace.mark("wav_saved")
+            return samples
         except Exception as e:
             logger.error(f"Error in stop_recording: {e}")
             return None
 
-    def _save_to_file(self):
+    def _counters(self):
+        return (self.overflows, self.dropped_frames, self.late_frames, self.captured_frames)
+
+    def _utterance_stats(self):
+        baseline = self._baseline or (0, 0, 0, 0)
+        overflows, dropped, late, frames = (now - then for now, then in zip(self._counters(), baseline))
+        self.last_utterance_stats = {
+            "frames": frames,
+            "dropped_frames": dropped,
+            "late_frames": late,
+            "overflows": overflows,
+        }
+        return self.last_utterance_stats
+
+    def stats(self):
+        """Capture metrics since startup, plus the last utterance's."""
+        return {
+            "captured_frames": self.captured_frames,
+            "dropped_frames": self.dropped_frames,
+            "late_frames": self.late_frames,
+            "overflows": self.overflows,
+            "max_delay_ms": self.max_delay_ms,
+            "last_utterance": self.last_utterance_stats,
+        }
+
+    def _open_stream(self):
+        self._next_adc_time = 0.0  # A new stream starts a new device timeline
+        return self.audio.open(
+            format=pyaudio.paInt16,
+            channels=config.CHANNELS,
+            rate=config.SAMPLE_RATE,
+            input=True,
+            frames_per_buffer=config.CHUNK_SIZE,
+            stream_callback=self._on_audio
+        )
+
+    def _close_stream(self):
+        """Caller must hold self._lock."""
+        if self.stream:
+            try:
+                self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                logger.error(f"Error closing stream: {e}")
+            self.stream = None
+
+    def _new_buffer(self):
+        return AudioRingBuffer(config.SAMPLE_RATE * config.RECORD_BUFFER_SECONDS)
+
+    def _save_to_file(self, samples):
+        """Debug sink: keep a copy of each utterance under a unique name in TEMP_DIR."""
         try:
-            filename = os.path.join(config.TEMP_DIR, "output.wav")
-            with wave.open(filename, 'wb') as wf:
-                wf.setnchannels(config.CHANNELS)
-                wf.setsampwidth(self.audio.get_sample_size(pyaudio.paInt16))
-                wf.setframerate(config.SAMPLE_RATE)
-                wf.writeframes(b''.join(self.frames))
+            filename = os.path.join(config.TEMP_DIR, f"utterance_{datetime.now():%Y%m%d_%H%M%S_%f}.wav")
+            save_wav(samples, filename)
+            logger.debug(f"Saved debug audio to {filename}")
             return filename
         except Exception as e:
             logger.error(f"Error saving audio to file: {e}")
@@ -0,0 +1,91 @@
+"""
+STT engine lifecycle: loading -> warming -> ready, or degraded.
+The Transcriber is built and warmed up on a background thread. Utterances recorded
+before it is ready wait in the job queue (wait_until_usable) instead of being dropped,
+and listeners (the tray) are told about every state change.
+"""
+import time
+import threading
+import traceback
+from src.config import config
+from src.utils.logger import logger
+from src.utils.scheduling import apply_role, INFERENCE
+
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+DEGRADED = "degraded"  # Load or warm-up failed; usable only if a provider exists
+
+class EngineLifecycle:
+    def __init__(self, on_state_change=None):
+        self.state = LOADING
+        self.transcriber = None
+        self.error = None
+        self.on_state_change = on_state_change
+        self._cond = threading.Condition()
+
+    def start(self):
+        threading.Thread(target=self._run, name="EngineLoader", daemon=True).start()
+
+    @property
+    def usable(self):
+        """A transcriber exists and is not busy with its first load/warm-up."""
+        return self.state in (READY, DEGRADED) and self.transcriber is not None
+
+    def wait_until_usable(self, timeout=None):
+        """Block until loading has finished. Returns the transcriber, or None if unavailable."""
+        with self._cond:
+            if self.state in (LOADING, WARMING):
+                logger.info(f"Utterance queued until the STT engine is ready ({self.state}).")
+            self._cond.wait_for(lambda: self.state in (READY, DEGRADED), timeout)
+            return self.transcriber if self.usable else None
+
+    def _set_state(self, state, error=None):
+        with self._cond:
+            self.state = state
+            if error:
+                self.error = error
+            self._cond.notify_all()
+        if self.on_state_change:
+            try:
+                self.on_state_change(state)
+            except Exception as e:
+                logger.error(f"Engine state callback failed: {e}")
+
+    def _run(self):
+        # Before loading: on Linux the engine's native thread pools inherit this policy
+        apply_role(INFERENCE)
+        start = time.perf_counter()
+        try:
+            # Imported here so the provider chain (and its HTTP/model libraries)
+            # loads off the startup path
+            from src.services.transcriber import Transcriber
+            transcriber = Transcriber()
+        except Exception as e:
+            logger.error(f"Failed to load transcriber: {e}")
+            logger.debug(traceback.format_exc())
+            self._set_state(DEGRADED, str(e))
+            return
+
+        if not transcriber.provider:
+            self.transcriber = transcriber
+            self._set_state(DEGRADED, "No STT provider available")
+            return
+        logger.info(f"STT engine loaded in {time.perf_counter() - start:.1f} s.")
+
+        if config.ENGINE_WARMUP:
+            self._set_state(WARMING)
+            warm_start = time.perf_counter()
+            try:
+                transcriber.warm_up()
+                logger.info(f"STT engine warmed up in {(time.perf_counter() - warm_start) * 1000:.0f} ms.")
+            except Exception as e:
+                # The engine may still work; the first utterance just pays the lazy init
+                logger.warning(f"STT warm-up failed: {e}")
+                logger.debug(traceback.format_exc())
+                self.transcriber = transcriber
+                self._set_state(DEGRADED, f"Warm-up failed: {e}")
+                return
+
+        self.transcriber = transcriber
+        self._set_state(READY)
@@ -1,27 +1,41 @@
 from pynput import keyboard
 import threading
+import time
 from src.config import config
 from src.services.audio_recorder import AudioRecorder
-from src.services.transcriber import Transcriber
 from src.services.text_injector import TextInjector
-from src.services.llm_refiner import LLMRefiner
+from src.services.llm_refiner import create_refiner
+from src.services.job_scheduler import JobScheduler
 from src.utils.logger import logger
+from src.utils.tracing import start_trace, NULL_TRACE
+from src.utils.import_profiler import profiler
+from src.utils.history import record_correction
+from src.utils.scheduling import apply_role, HOTKEY
+from src.services.engine_lifecycle import EngineLifecycle, READY
 import sys
 import os
 import traceback
 
 class HotkeyManager:
-    def __init__(self, on_recording_start=None, on_recording_stop=None, on_audio_level=None):
+    def __init__(self, on_recording_start=None, on_recording_stop=None, on_audio_level=None, on_partial_text=None,
+                 on_engine_state=None):
         self.on_audio_level = on_audio_level
+        self.on_partial_text = on_partial_text
         self.recorder = AudioRecorder(on_audio_level=on_audio_level)
-        self.transcriber = None
+        self.on_engine_state = on_engine_state
         self.injector = TextInjector()
-        self.refiner = LLMRefiner()
+        self.refiner = create_refiner()
         self.on_recording_start = on_recording_start
         self.on_recording_stop = on_recording_stop
+        self.stream_session = None
+        self.record_started_at = None
+        self.trace = NULL_TRACE
+        # Utterances are transcribed by a bounded worker pool and injected in order
+        self.scheduler = JobScheduler(process=self._process_audio, deliver=self.injector.type_text)
         
-        # Async model loading
-        threading.Thread(target=self._load_transcriber, daemon=True).start()
+        # Async model loading and warm-up; audio recorded meanwhile waits in the scheduler
+        self.engine = EngineLifecycle(on_state_change=self._on_engine_state)
+        self.engine.start()
         
         # Track pressed keys for push-to-talk
         self.pressed_keys = set()
@@ -29,11 +43,17 @@ class HotkeyManager:
         self.listener = None
         self.is_listening = False
 
-    def _load_transcriber(self):
-        try:
-            self.transcriber = Transcriber()
-        except Exception as e:
-            logger.error(f"Failed to load transcriber: {e}")
+    @property
+    def transcriber(self):
+        """The loaded Transcriber, or None while the engine is loading or warming up."""
+        return self.engine.transcriber if self.engine.usable else None
+
+    def _on_engine_state(self, state):
+        logger.info(f"STT engine state: {state}")
+        if state == READY and profiler:
+            logger.info(profiler.report())
+        if self.on_engine_state:
+            self.on_engine_state(state)
 
     def start_listening(self):
         self.is_listening = True
@@ -49,9 +69,15 @@ class HotkeyManager:
         self.is_listening = False
         if self.listener:
             self.listener.stop()
+        self.recorder.close()
+        self.scheduler.stop()
+        self.injector.close()
         logger.info("Hotkey listener stopped.")
 
     def _on_press(self, key):
+        # Runs on pynput's listener thread; the first event sets its priority
+        apply_role(HOTKEY)
+        self.injector.note_user_input()
         try:
             if key == keyboard.Key.ctrl_l or key == keyboard.Key.ctrl_r:
                 self.pressed_keys.add('ctrl')
@@ -67,6 +93,7 @@ class HotkeyManager:
                 self._start_recording()
 
     def _on_release(self, key):
+        apply_role(HOTKEY)
         try:
             if key == keyboard.Key.ctrl_l or key == keyboard.Key.ctrl_r:
                 self.pressed_keys.discard('ctrl')
@@ -85,7 +112,19 @@ class HotkeyManager:
         try:
             if not self.recorder.is_recording:
                 logger.debug("Hotkey combo pressed: Starting recording")
-                self.recorder.start_recording()
+                self.record_started_at = time.monotonic()
+                self.trace = start_trace()
+                # Open network connections while the user is still speaking
+                transcriber = self.transcriber
+                if transcriber:
+                    transcriber.prewarm()
+                self.refiner.prewarm()
+                # While the engine is loading there is no session; the clip is queued whole
+                self.stream_session = transcriber.start_stream() if transcriber else None
+                if self.stream_session and config.PARTIAL_RESULTS_ENABLED:
+                    self.stream_session.on_partial = self.on_partial_text
+                on_chunk = self.stream_session.feed if self.stream_session else None
+                self.recorder.start_recording(on_chunk=on_chunk, trace=self.trace)
                 # Play a short, subtle notification
                 if sys.platform == 'win32':
                     import winsound
@@ -102,27 +141,73 @@ class HotkeyManager:
         try:
             if self.recorder.is_recording:
                 logger.debug("Hotkey combo released: Stopping recording")
-                audio_file = self.recorder.stop_recording()
+                trace, self.trace = self.trace, NULL_TRACE
+                trace.mark("release")
+                audio = self.recorder.stop_recording()
+                session, self.stream_session = self.stream_session, None
                 if self.on_recording_stop:
                     self.on_recording_stop()
                 
-                if audio_file:
-                    threading.Thread(target=self._process_audio, args=(audio_file,), daemon=True).start()
+                if audio is not None or session:
+                    self.scheduler.submit(audio=audio, session=session, recorded_at=self.record_started_at, trace=trace)
+                else:
+                    trace.finish()
         except Exception as e:
             logger.error(f"Error stopping recording via hotkey: {e}")
 
-    def _process_audio(self, audio_file):
+    def _process_audio(self, job):
+        """Runs on a scheduler worker; the returned text is injected in utterance order."""
         try:
-            if not self.transcriber:
-                logger.warning("Transcriber still loading...")
-                self.injector.type_text("(AI模型正在加载中，请稍后再试...)")
-                return
+            # Recorded while the engine was loading: wait for it rather than drop the audio
+            transcriber = self.engine.wait_until_usable(config.ENGINE_LOAD_TIMEOUT)
+            if not transcriber:
+                # Never paste a status message into the user's document
+                logger.error(f"STT engine unavailable ({self.engine.state}: {self.engine.error}), utterance dropped.")
+                return None
 
-            text = self.transcriber.transcribe(audio_file)
-            if text:
+            trace = job.trace
+            trace.annotate(audio_seconds=round(job.duration, 2), provider=config.STT_PROVIDER,
+                           streaming=job.session is not None)
+            trace.mark("stt_start")
+            # Cascade mode: the accurate tier may later correct what the fast tier injects
+            on_correction = (lambda accurate: self._apply_correction(job, accurate)) if config.CASCADE_ENABLED else None
+            if job.session:
+                # Most of the audio was decoded while recording; only the tail is left
+                text = transcriber.finish_stream(job.session, job.audio, on_correction=on_correction)
+            else:
+                text = transcriber.transcribe(job.audio, on_correction=on_correction)
+            trace.mark("stt_end")
+            if text and not job.cancelled:
                 # Refine text if enabled
-                refined_text = self.refiner.refine(text)
-                self.injector.type_text(refined_text)
+                trace.mark("refine_start")
+                text = self.refiner.refine(text)
+                trace.mark("refine_end")
+                trace.annotate(chars=len(text))
+                return text
+            return None
         except Exception as e:
             logger.error(f"Error processing audio in thread: {e}")
             logger.debug(traceback.format_exc())
+            return None
+
+    def _apply_correction(self, job, accurate):
+        """Runs on the cascade thread once the accurate model has transcribed the job's audio."""
+        try:
+            # The fast result may still be queued behind earlier utterances
+            if not job.delivered.wait(config.CASCADE_CORRECTION_WINDOW) or job.cancelled or not job.text:
+                return
+            corrected = self.refiner.refine(accurate) if accurate else ""
+            if not corrected or self._normalized(corrected) == self._normalized(job.text):
+                return
+            applied = self.injector.replace_last(job.text, corrected, max_age=config.CASCADE_CORRECTION_WINDOW)
+            if not applied:
+                logger.info(f"Correction not applied (text no longer replaceable), kept in history: {corrected}")
+            record_correction(job.text, corrected, applied)
+        except Exception as e:
+            logger.error(f"Error applying correction: {e}")
+            logger.debug(traceback.format_exc())
+
+    @staticmethod
+    def _normalized(text):
+        # Case, spacing and punctuation differences are not worth rewriting the user's text for
+        return "".join(c for c in text.lower() if c.isalnum())
@@ -0,0 +1,209 @@
+"""
+Ordered transcription job queue.
+Utterances are processed by a bounded pool of workers, and their results are delivered
+strictly in submission order by a single delivery thread. Short back-to-back
+utterances that are still waiting are coalesced into one job; their streaming sessions
+are cancelled and the merged audio is decoded in one pass.
+"""
+import time
+import threading
+from collections import deque
+import numpy as np
+from src.config import config
+from src.utils.logger import logger
+from src.utils.tracing import NULL_TRACE
+from src.utils.scheduling import apply_role, INFERENCE
+
+class TranscriptionJob:
+    def __init__(self, seq, audio=None, session=None, recorded_at=None, trace=NULL_TRACE):
+        self.seq = seq
+        self.audio = audio
+        self.session = session
+        self.recorded_at = recorded_at
+        self.trace = trace
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.text = None
+        self.cancelled = False
+        self.merged = 1
+        self.delivered = threading.Event()  # Set once the result was injected or dropped
+
+    @property
+    def duration(self):
+        if self.audio is None:
+            return 0.0
+        return len(self.audio) / config.SAMPLE_RATE
+
+    @property
+    def wait_time(self):
+        return (self.started_at or time.monotonic()) - self.submitted_at
+
+class JobScheduler:
+    def __init__(self, process, deliver, max_workers=None):
+        """
+        process(job) -> str runs on a worker thread.
+        deliver(text, trace) runs on the delivery thread, one job at a time, in submission order.
+        """
+        self._process = process
+        self._deliver = deliver
+        self._pending = deque()
+        self._active = set()
+        self._finished = {}
+        self._next_seq = 0
+        self._next_delivery = 0
+        self._cond = threading.Condition()
+        self._running = True
+
+        # Metrics
+        self.max_queue_depth = 0
+        self.jobs_done = 0
+        self.jobs_coalesced = 0
+        self.jobs_cancelled = 0
+        self._total_wait = 0.0
+        self.max_wait = 0.0
+
+        for i in range(max_workers or config.SCHEDULER_MAX_WORKERS):
+            threading.Thread(target=self._worker_loop, name=f"TranscribeWorker-{i}", daemon=True).start()
+        threading.Thread(target=self._delivery_loop, name="ResultDelivery", daemon=True).start()
+
+    @property
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def submit(self, audio=None, session=None, recorded_at=None, trace=NULL_TRACE):
+        """Queue an utterance (a sample buffer or a streaming session). Returns the job."""
+        with self._cond:
+            if config.SCHEDULER_REPLACE_PENDING:
+                self._cancel_undelivered()
+
+            merged = self._try_coalesce(audio, session, recorded_at)
+            if merged:
+                trace.annotate(coalesced_into=merged.seq)
+                trace.finish()
+                return merged
+
+            job = TranscriptionJob(self._next_seq, audio, session, recorded_at, trace)
+            self._next_seq += 1
+            self._pending.append(job)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+            logger.debug(f"Job {job.seq} queued (depth {len(self._pending)}).")
+            self._cond.notify_all()
+            return job
+
+    def cancel(self, job):
+        with self._cond:
+            self._cancel(job)
+            self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            done = max(1, self.jobs_done)
+            return {
+                "queue_depth": len(self._pending),
+                "max_queue_depth": self.max_queue_depth,
+                "jobs_done": self.jobs_done,
+                "jobs_coalesced": self.jobs_coalesced,
+                "jobs_cancelled": self.jobs_cancelled,
+                "avg_wait_ms": self._total_wait / done * 1000,
+                "max_wait_ms": self.max_wait * 1000,
+            }
+
+    def _try_coalesce(self, audio, session, recorded_at):
+        """Merge a short utterance into the last queued one if both are short and close together."""
+        if not self._pending or audio is None or recorded_at is None:
+            return None
+        last = self._pending[-1]
+        if last.audio is None or last.cancelled:
+            return None
+        new_duration = len(audio) / config.SAMPLE_RATE
+        gap = recorded_at - last.submitted_at
+        if (last.duration + new_duration > config.COALESCE_MAX_SECONDS
+                or gap > config.COALESCE_GAP_SECONDS):
+            return None
+        pause = np.zeros(int(config.SAMPLE_RATE * 0.3), dtype=np.int16)
+        last.audio = np.concatenate([last.audio, pause, audio])
+        # Each session only saw its own part; the worker transcribes the merged audio instead
+        for stale in (last.session, session):
+            if stale:
+                stale.cancel()
+        last.session = None
+        last.merged += 1
+        self.jobs_coalesced += 1
+        logger.debug(f"Coalesced utterance into job {last.seq} ({last.merged} parts).")
+        return last
+
+    def _cancel(self, job):
+        """Caller must hold self._cond."""
+        if job.cancelled:
+            return
+        job.cancelled = True
+        job.trace.annotate(cancelled=True)
+        self.jobs_cancelled += 1
+        if job.session:
+            job.session.cancel()
+        if job in self._pending:
+            # Never started: hand it straight to delivery so the sequence keeps moving
+            self._pending.remove(job)
+            job.finished_at = time.monotonic()
+            self._finished[job.seq] = job
+        logger.debug(f"Job {job.seq} cancelled.")
+
+    def _cancel_undelivered(self):
+        """A newer utterance replaces everything not yet injected."""
+        for job in list(self._pending) + list(self._active) + list(self._finished.values()):
+            self._cancel(job)
+
+    def _worker_loop(self):
+        apply_role(INFERENCE)
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._pending.popleft()
+                self._active.add(job)
+                job.started_at = time.monotonic()
+                self._total_wait += job.wait_time
+                self.max_wait = max(self.max_wait, job.wait_time)
+
+            logger.debug(f"Job {job.seq} started after {job.wait_time * 1000:.0f} ms in queue.")
+            try:
+                job.text = self._process(job)
+            except Exception as e:
+                logger.error(f"Job {job.seq} failed: {e}")
+                job.text = None
+
+            with self._cond:
+                self._active.discard(job)
+                job.finished_at = time.monotonic()
+                self._finished[job.seq] = job
+                self.jobs_done += 1
+                self._cond.notify_all()
+
+    def _delivery_loop(self):
+        while True:
+            with self._cond:
+                while self._running and self._next_delivery not in self._finished:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                job = self._finished.pop(self._next_delivery)
+                self._next_delivery += 1
+
+            if job.cancelled or not job.text:
+                job.trace.finish()
+                job.delivered.set()
+                continue
+            try:
+                self._deliver(job.text, job.trace)
+            except Exception as e:
+                logger.error(f"Delivering job {job.seq} failed: {e}")
+            job.delivered.set()
@@ -1,7 +1,190 @@
-import requests
+import re
 import json
+import time
+import threading
+from collections import deque
 from src.config import config
 from src.utils.logger import logger
+from src.services.result_cache import create_cache, text_fingerprint
+from src.utils.scheduling import apply_role, BACKGROUND
+
+PUNCTUATION = set("，,、。.！!？?；;：:…~～ \t\n")
+REPEAT_SEPARATORS = "，,、 "  # A pause between two copies marks a stutter
+
+class FillerMatcher:
+    """Aho-Corasick automaton over the filler words; finds every occurrence in one pass."""
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [None]  # Longest word ending at each state
+        for word in words:
+            state = 0
+            for ch in word:
+                if ch not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                    self.goto[state][ch] = len(self.goto) - 1
+                state = self.goto[state][ch]
+            if self.output[state] is None or len(word) > len(self.output[state]):
+                self.output[state] = word
+
+        # Breadth-first fail links (depth-1 states fail to the root); a state with no
+        # word of its own reports the longest word ending at its fail state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def find(self, text):
+        """Non-overlapping (start, end, word) matches, preferring the longest at each position."""
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            word = self.output[state]
+            if word:
+                found.append((i + 1 - len(word), i + 1, word))
+
+        matches = []
+        for start, end, word in sorted(found, key=lambda m: (m[0], -m[1])):
+            if not matches or start >= matches[-1][1]:
+                matches.append((start, end, word))
+        return matches
+
+class RuleBasedRefiner:
+    """
+    Local, network-free drop-in for LLMRefiner: removes the filler words of LLM_PROMPT
+    and collapses stuttered repeats, in microseconds.
+    Interjections (嗯/啊) are always removed. Ambiguous fillers (那个/就是/然后) are
+    removed only at a clause start and followed by a pause or another filler, so
+    "那个，我觉得" loses it but "那个人" and "然后我们走了" are kept.
+    """
+
+    def __init__(self, interjections=None, phrases=None, max_ngram=6):
+        self.enabled = True
+        self.interjections = set(interjections if interjections is not None else config.FILLER_INTERJECTIONS)
+        self.phrases = set(phrases if phrases is not None else config.FILLER_PHRASES)
+        self.matcher = FillerMatcher(self.interjections | self.phrases)
+        self.max_ngram = max_ngram
+
+    def prewarm(self):
+        pass
+
+    def refine(self, text):
+        if not text or not text.strip():
+            return text
+        return self.collapse_repeats(self.remove_fillers(text))
+
+    def remove_fillers(self, text):
+        matches = self.matcher.find(text)
+        if not matches:
+            return text
+        starts = {m[0] for m in matches}
+        out = []
+        pos = 0
+        clause_start = True   # Is the next output position at the start of a clause?
+        for start, end, word in matches:
+            if start < pos:
+                continue
+            before = text[pos:start]
+            if before:
+                out.append(before)
+                clause_start = before[-1] in PUNCTUATION
+            if word in self.interjections:
+                remove = True
+            else:
+                pause = end == len(text) or text[end] in PUNCTUATION or end in starts
+                remove = clause_start and pause
+            if not remove:
+                out.append(word)
+                clause_start = False
+                pos = end
+                continue
+            # Drop the filler together with the pause that follows it
+            pos = end
+            while pos < len(text) and text[pos] in "，,、 ":
+                pos += 1
+        out.append(text[pos:])
+        return self._tidy("".join(out))
+
+    def collapse_repeats(self, text):
+        """
+        Collapse stuttered repeats: ones separated by a pause ("需要，需要" -> "需要",
+        "the, the" -> "the") or occurring 3+ times ("这个这个这个" -> "这个").
+        A plain double is kept, since it is usually deliberate: 研究研究, 一个一个, "that that".
+        """
+        words = text.split(" ")
+        if len(words) > 1:
+            text = " ".join(self._collapse_words(words))
+
+        out = []
+        i = 0
+        n_chars = len(text)
+        while i < n_chars:
+            for n in range(min(self.max_ngram, (n_chars - i) // 2), 1, -1):
+                gram = text[i:i + n]
+                # Skip reduplication of one character ("哈哈哈哈", "谢谢谢谢")
+                if not (gram.isalpha() and not gram.isascii() and len(set(gram)) > 1):
+                    continue
+                count, paused, j = 1, False, i + n
+                while True:
+                    k = j
+                    while k < n_chars and text[k] in REPEAT_SEPARATORS:
+                        k += 1
+                    if text[k:k + n] != gram:
+                        break
+                    count += 1
+                    paused = paused or k > j
+                    j = k + n
+                if count >= 3 or paused:
+                    out.append(gram)
+                    i = j
+                    break
+            else:
+                out.append(text[i])
+                i += 1
+        return "".join(out)
+
+    @staticmethod
+    def _collapse_words(words):
+        out = []
+        i = 0
+        while i < len(words):
+            key = words[i].rstrip(",").lower()
+            j = i + 1
+            while j < len(words) and key and words[j].rstrip(",").lower() == key:
+                j += 1
+            # "the, the" (pause) or "the the the" (3+) is a stutter; "that that" is grammar
+            paused = any(w.endswith(",") for w in words[i:j - 1])
+            if j - i >= 3 or (j - i == 2 and paused):
+                out.append(words[j - 1])
+            else:
+                out.extend(words[i:j])
+            i = j
+        return out
+
+    def uncertain(self, text):
+        """True if an ambiguous filler is left that only context (the LLM) can decide."""
+        return any(word in self.phrases for _, _, word in self.matcher.find(text))
+
+    @staticmethod
+    def _tidy(text):
+        # Removing a sentence-final particle can leave "，。" or a leading comma behind
+        text = re.sub(r"[，,、]+([。！？!?])", r"\1", text)
+        text = re.sub(r"([，,、])[，,、]+", r"\1", text)
+        # ...and removing a leading interjection can leave "？什么"
+        return text.lstrip("，,、？?！!。. ").strip()
 
 class LLMRefiner:
     def __init__(self):
@@ -9,35 +192,129 @@ class LLMRefiner:
         self.api_url = config.LLM_API_URL
         self.model = config.LLM_MODEL
         self.prompt_template = config.LLM_PROMPT
+        self.budget = config.LLM_LATENCY_BUDGET_MS / 1000 if config.LLM_LATENCY_BUDGET_MS else None
+        self.rules = RuleBasedRefiner() if config.LLM_LOCAL_FILTER else None
+        self.cache = create_cache("refinements", config.REFINE_CACHE_MAX_BYTES)
+
+    def _cache_key(self, text):
+        normalized = " ".join(text.split())
+        return text_fingerprint(normalized, self.prompt_template, self.model)
+
+    def prewarm(self):
+        if self.enabled:
+            from src.utils.http_client import http_client
+            http_client.prewarm(self.api_url)
 
     def refine(self, text):
         if not self.enabled or not text.strip():
             return text
 
+        if self.rules:
+            cleaned = self.rules.refine(text)
+            if not cleaned:
+                # Nothing but fillers; keep the original rather than inject nothing
+                return text
+            if not self.rules.uncertain(cleaned):
+                if cleaned != text:
+                    logger.info(f"Refined Text (local rules): {cleaned}")
+                return cleaned
+            text = cleaned
+
+        key = self._cache_key(text) if self.cache else None
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.info(f"Refined Text (cached): {cached}")
+                return cached
+
         logger.debug(f"Refining text via LLM: {text}")
-        
+
         payload = {
             "model": self.model,
             "prompt": f"{self.prompt_template}{text}",
-            "stream": False,
+            "stream": config.LLM_STREAMING,
             "options": {
                 "temperature": 0.3, # Low temperature for more consistent results
                 "num_predict": 100  # Usually enough for a single response
             }
         }
 
+        start = time.perf_counter()
+        refined_text = self._request_within_budget(payload)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if refined_text is None:
+            logger.warning(f"LLM refinement exceeded {config.LLM_LATENCY_BUDGET_MS} ms, using original text.")
+            return text
+        if refined_text:
+            logger.info(f"Refined Text ({elapsed_ms:.0f} ms): {refined_text}")
+            if key:
+                self.cache.put(key, refined_text)
+            return refined_text
+        logger.warning("LLM returned empty response, using original text.")
+        return text
+
+    def _request_within_budget(self, payload):
+        """
+        Run the request on a helper thread and wait at most the latency budget.
+        Returns the refined text ("" on failure or empty output), or None if the budget ran out.
+        """
+        result = {"text": "", "response": None, "abandoned": False}
+        done = threading.Event()
+
+        def run():
+            apply_role(BACKGROUND)
+            try:
+                result["text"] = self._request(payload, result)
+            except Exception as e:
+                if not result["abandoned"]:
+                    logger.error(f"LLM Refining failed: {e}")
+            finally:
+                done.set()
+
+        threading.Thread(target=run, name="LLMRefine", daemon=True).start()
+        if done.wait(self.budget):
+            return result["text"]
+
+        # Stop the generation; closing the response unblocks the reader
+        result["abandoned"] = True
+        try:
+            if result["response"] is not None:
+                result["response"].close()
+        except Exception:
+            pass
+        return None
+
+    def _request(self, payload, result):
+        from src.utils.http_client import http_client
+        streaming = payload["stream"]
+        response = http_client.post(self.api_url, endpoint="llm", json=payload, stream=streaming)
+        result["response"] = response
         try:
-            response = requests.post(self.api_url, json=payload, timeout=10)
             response.raise_for_status()
-            result = response.json()
-            refined_text = result.get("response", "").strip()
-            
-            if refined_text:
-                logger.info(f"Refined Text: {refined_text}")
-                return refined_text
-            else:
-                logger.warning("LLM returned empty response, using original text.")
-                return text
-        except Exception as e:
-            logger.error(f"LLM Refining failed: {e}")
-            return text
+            if not streaming:
+                return response.json().get("response", "").strip()
+
+            # Ollama streams one JSON object per line: {"response": "<piece>", "done": false}
+            pieces = []
+            for line in response.iter_lines():
+                if result["abandoned"]:
+                    break
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                pieces.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    break
+            return "".join(pieces).strip()
+        finally:
+            response.close()
+
+def create_refiner():
+    """Refiner backend per REFINER_ENGINE."""
+    if config.REFINER_ENGINE == "rules":
+        logger.info("Using the local rule-based refiner.")
+        return RuleBasedRefiner()
+    return LLMRefiner()
@@ -0,0 +1,66 @@
+"""
+Long-form transcription: split a long recording at pauses into overlapping chunks,
+transcribe the chunks in parallel, and stitch the texts back together.
+Chunks are cut at the quietest point near each chunk boundary and start a little
+before the cut, so a word clipped by an imperfect pause is complete in one of the
+two chunks; the duplicated words are removed when stitching.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from src.config import config
+from src.utils.logger import logger
+from src.utils.audio import find_quiet_split
+from src.utils.scheduling import apply_role, INFERENCE
+
+def plan_chunks(samples, sample_rate, chunk_seconds, overlap_seconds, search_seconds=5.0):
+    """[(start, end)] sample ranges covering the clip, cut at pauses, each starting `overlap` early."""
+    n_samples = len(samples)
+    chunk = int(chunk_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    search = int(search_seconds * sample_rate)
+    cuts = [0]
+    while n_samples - cuts[-1] > chunk:
+        target = cuts[-1] + chunk
+        # Quietest point in the last few seconds before the nominal boundary
+        cuts.append(find_quiet_split(samples, max(cuts[-1] + 1, target - search), target))
+    cuts.append(n_samples)
+    return [(max(0, start - overlap) if i else 0, end) for i, (start, end) in enumerate(zip(cuts, cuts[1:]))]
+
+def _join(left, right):
+    if left and right and left[-1].isascii() and left[-1].isalnum() and right[0].isascii() and right[0].isalnum():
+        return f"{left} {right}"
+    return left + right
+
+def stitch(texts, max_overlap_chars=40):
+    """Concatenate chunk texts, dropping the longest prefix of each that repeats the previous text's tail."""
+    result = ""
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        for k in range(min(len(result), len(text), max_overlap_chars), 1, -1):
+            if result.endswith(text[:k]):
+                text = text[k:].lstrip()
+                break
+        result = _join(result, text)
+    return result
+
+class LongFormRunner:
+    """Parallel chunked transcription on top of a provider's single-clip `transcribe(samples)`."""
+
+    def __init__(self, transcribe, workers):
+        self._transcribe = transcribe
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="LongForm",
+                                        initializer=apply_role, initargs=(INFERENCE,))
+
+    def applies(self, samples):
+        return len(samples) >= config.LONGFORM_MIN_SECONDS * config.SAMPLE_RATE
+
+    def transcribe(self, samples):
+        chunks = plan_chunks(samples, config.SAMPLE_RATE,
+                             config.LONGFORM_CHUNK_SECONDS, config.LONGFORM_OVERLAP_SECONDS)
+        logger.info(f"Long-form: {len(samples) / config.SAMPLE_RATE:.0f} s in {len(chunks)} chunks, "
+                    f"{self.workers} worker(s).")
+        # map() keeps chunk order while the pool runs them concurrently
+        texts = list(self._pool.map(lambda r: self._transcribe(samples[r[0]:r[1]]), chunks))
+        return stitch(texts)
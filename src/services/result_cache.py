@@ -0,0 +1,127 @@
+"""
+Bounded LRU cache for refinement results: repeated refinement inputs are answered
+without another LLM round trip.
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from src.config import config
+from src.utils.logger import logger
+
+def text_fingerprint(*parts):
+    return hashlib.blake2b("\x1f".join(str(p) for p in parts).encode("utf-8"), digest_size=16).hexdigest()
+
+class LRUCache:
+    """
+    String-to-string LRU cache bounded by total size in bytes, with hit/miss counters.
+    If `persist_path` is set, each put is appended to that JSON-lines journal (one short
+    write, never a rewrite); the journal is replayed and compacted when the cache loads.
+    """
+
+    def __init__(self, name, max_bytes, persist_path=None):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.persist_path = persist_path
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if persist_path:
+            self._load()
+
+    @staticmethod
+    def _entry_size(key, value):
+        return len(key) + len(value.encode("utf-8"))
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._size -= self._entry_size(key, self._items.pop(key))
+            self._items[key] = value
+            self._size += size
+            while self._size > self.max_bytes:
+                old_key, old_value = self._items.popitem(last=False)
+                self._size -= self._entry_size(old_key, old_value)
+                self.evictions += 1
+        if self.persist_path:
+            self._append(key, value)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _load(self):
+        try:
+            if not os.path.exists(self.persist_path):
+                return
+            lines = 0
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        key, value = json.loads(line)
+                    except ValueError:
+                        continue  # A write cut short by a crash
+                    lines += 1
+                    if key in self._items:
+                        self._size -= self._entry_size(key, self._items.pop(key))
+                    self._items[key] = value
+                    self._size += self._entry_size(key, value)
+            while self._size > self.max_bytes:
+                old_key, old_value = self._items.popitem(last=False)
+                self._size -= self._entry_size(old_key, old_value)
+            if lines > 2 * len(self._items):
+                self._compact()
+            logger.debug(f"Loaded {len(self._items)} cached {self.name} results.")
+        except Exception as e:
+            logger.warning(f"Could not load {self.name} cache: {e}")
+
+    def _append(self, key, value):
+        try:
+            with self._lock:
+                with open(self.persist_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps([key, value], ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning(f"Could not save {self.name} cache: {e}")
+
+    def _compact(self):
+        """Rewrite the journal with only the live entries (once, at load)."""
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for key, value in self._items.items():
+                f.write(json.dumps([key, value], ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.persist_path)
+
+def create_cache(name, max_bytes):
+    """Build a cache per the CACHE_* settings, or None when caching is disabled."""
+    if not config.CACHE_ENABLED:
+        return None
+    persist_path = None
+    if config.CACHE_PERSIST:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        persist_path = os.path.join(config.CACHE_DIR, f"{name}.jsonl")
+    return LRUCache(name, max_bytes, persist_path)
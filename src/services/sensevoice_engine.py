@@ -0,0 +1,210 @@
+"""
+Local SenseVoiceSmall inference on ONNX Runtime.
+
+Expected files in SENSEVOICE_MODEL_DIR (the FunASR ONNX export of iic/SenseVoiceSmall):
+    model_quant.onnx (or model.onnx), am.mvn, tokens.json (or sherpa-onnx style tokens.txt)
+
+Pipeline: int16 audio -> Kaldi-compatible 80-dim fbank (vectorized NumPy) -> LFR (7/6)
+-> CMVN -> one InferenceSession run per batch -> CTC greedy decoding.
+The model is non-autoregressive, so one padded run decodes several utterances at once.
+"""
+import os
+import json
+import time
+import threading
+import numpy as np
+from src.config import config
+from src.utils.logger import logger
+from src.utils.scheduling import apply_role, INFERENCE
+
+LANGUAGE_IDS = {"auto": 0, "zh": 3, "en": 4, "yue": 7, "ja": 11, "ko": 12, "nospeech": 13}
+TEXTNORM_IDS = {"withitn": 14, "woitn": 15}
+
+class FbankFrontend:
+    """Kaldi-style fbank (25 ms hamming, 10 ms shift, 80 mels) followed by LFR and CMVN."""
+
+    def __init__(self, cmvn_path, sample_rate=16000, n_mels=80, lfr_m=7, lfr_n=6):
+        self.sample_rate = sample_rate
+        self.frame_length = sample_rate * 25 // 1000
+        self.frame_shift = sample_rate * 10 // 1000
+        self.n_fft = 512
+        self.lfr_m = lfr_m
+        self.lfr_n = lfr_n
+        self.window = np.hamming(self.frame_length).astype(np.float32)
+        self.mel_banks = self._mel_banks(n_mels)
+        self.neg_mean, self.inv_std = self._load_cmvn(cmvn_path)
+
+    def _mel_banks(self, n_mels, low_freq=20.0):
+        """Triangular filters on Kaldi's mel scale, shape (n_fft // 2 + 1, n_mels)."""
+        def mel(f):
+            return 1127.0 * np.log(1.0 + f / 700.0)
+        high_freq = self.sample_rate / 2
+        mel_low, mel_high = mel(low_freq), mel(high_freq)
+        delta = (mel_high - mel_low) / (n_mels + 1)
+        left = mel_low + np.arange(n_mels) * delta
+        center = left + delta
+        right = center + delta
+
+        # Kaldi ignores the Nyquist bin; it keeps a zero weight here
+        bin_mel = mel(np.arange(self.n_fft // 2) * self.sample_rate / self.n_fft)[:, None]
+        up = (bin_mel - left) / (center - left)
+        down = (right - bin_mel) / (right - center)
+        banks = np.maximum(0.0, np.minimum(up, down))
+        return np.vstack([banks, np.zeros((1, n_mels))]).astype(np.float32)
+
+    @staticmethod
+    def _load_cmvn(path):
+        """Read AddShift (negative mean) and Rescale (inverse stddev) vectors from a Kaldi am.mvn."""
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        vectors = {}
+        for i, line in enumerate(lines):
+            tag = line.strip().split(" ")[0]
+            if tag in ("<AddShift>", "<Rescale>") and i + 1 < len(lines):
+                values = lines[i + 1].split("[")[1].split("]")[0].split()
+                vectors[tag] = np.array(values, dtype=np.float32)
+        return vectors["<AddShift>"], vectors["<Rescale>"]
+
+    def fbank(self, samples):
+        """(n_frames, n_mels) log-mel energies. `samples` is int16 (Kaldi's waveform scale)."""
+        x = samples.astype(np.float32)
+        if len(x) < self.frame_length:
+            x = np.pad(x, (0, self.frame_length - len(x)))
+        frames = np.lib.stride_tricks.sliding_window_view(x, self.frame_length)[::self.frame_shift]
+        frames = frames - frames.mean(axis=1, keepdims=True)
+        # Pre-emphasis, with Kaldi's convention of x[-1] = x[0]
+        emphasized = np.empty_like(frames)
+        emphasized[:, 1:] = frames[:, 1:] - 0.97 * frames[:, :-1]
+        emphasized[:, 0] = frames[:, 0] * (1 - 0.97)
+        spectrum = np.fft.rfft(emphasized * self.window, n=self.n_fft)
+        power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+        return np.log(np.maximum(power @ self.mel_banks, np.finfo(np.float32).eps))
+
+    def lfr(self, feats):
+        """Stack lfr_m frames every lfr_n frames (left-padded with the first frame)."""
+        pad = (self.lfr_m - 1) // 2
+        padded = np.vstack([np.repeat(feats[:1], pad, axis=0), feats])
+        n_out = int(np.ceil(len(feats) / self.lfr_n))
+        idx = np.arange(n_out)[:, None] * self.lfr_n + np.arange(self.lfr_m)[None, :]
+        idx = np.minimum(idx, len(padded) - 1)
+        return padded[idx].reshape(n_out, -1)
+
+    def __call__(self, samples):
+        feats = self.lfr(self.fbank(samples))
+        return ((feats + self.neg_mean) * self.inv_std).astype(np.float32)
+
+class SenseVoiceEngine:
+    """One InferenceSession for the app's lifetime; decodes padded batches of utterances."""
+
+    def __init__(self, model_dir, device="cpu", threads=None):
+        import onnxruntime
+        model_path = os.path.join(model_dir, "model_quant.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads or max(1, min(4, (os.cpu_count() or 2) // 2))
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        providers = ["CPUExecutionProvider"]
+        if device == "cuda" and "CUDAExecutionProvider" in onnxruntime.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+
+        logger.info(f"Loading SenseVoice ONNX model from {model_path} ({options.intra_op_num_threads} threads)...")
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options, providers=providers)
+        self.frontend = FbankFrontend(os.path.join(model_dir, "am.mvn"))
+        self.tokens = self._load_tokens(model_dir)
+        self.language_id = LANGUAGE_IDS.get(config.SENSEVOICE_LANGUAGE or "auto", 0)
+        self.textnorm_id = TEXTNORM_IDS["withitn" if config.SENSEVOICE_USE_ITN else "woitn"]
+
+    @staticmethod
+    def _load_tokens(model_dir):
+        json_path = os.path.join(model_dir, "tokens.json")
+        if os.path.exists(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        tokens = {}
+        with open(os.path.join(model_dir, "tokens.txt"), "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").rsplit(" ", 1)
+                if len(parts) == 2:
+                    tokens[int(parts[1])] = parts[0]
+        return [tokens.get(i, "") for i in range(max(tokens) + 1)]
+
+    def infer(self, batch):
+        """Decode a list of int16 sample arrays in one padded model run."""
+        feats = [self.frontend(samples) for samples in batch]
+        lengths = np.array([len(f) for f in feats], dtype=np.int32)
+        speech = np.zeros((len(feats), lengths.max(), feats[0].shape[1]), dtype=np.float32)
+        for i, f in enumerate(feats):
+            speech[i, :len(f)] = f
+
+        n = len(feats)
+        logits, out_lens = self.session.run(None, {
+            "speech": speech,
+            "speech_lengths": lengths,
+            "language": np.full(n, self.language_id, dtype=np.int32),
+            "textnorm": np.full(n, self.textnorm_id, dtype=np.int32),
+        })
+        return [self._decode(logits[i, :out_lens[i]]) for i in range(n)]
+
+    def _decode(self, logits):
+        """CTC greedy decoding: argmax, collapse repeats, drop blanks and <|tag|> tokens."""
+        ids = logits.argmax(axis=-1)
+        keep = np.concatenate([[True], ids[1:] != ids[:-1]]) & (ids != 0)
+        pieces = [self.tokens[i] for i in ids[keep]]
+        text = "".join(p for p in pieces if not (p.startswith("<|") and p.endswith("|>")))
+        return text.replace("▁", " ").strip()
+
+class BatchingEngine:
+    """
+    Queues utterances from any thread and runs them through the engine in batches:
+    the first request waits up to SENSEVOICE_BATCH_WAIT_MS for others to join.
+    """
+
+    def __init__(self, engine, max_batch=None, wait_ms=None):
+        self.engine = engine
+        self.max_batch = max_batch or config.SENSEVOICE_BATCH_SIZE
+        self.wait = (config.SENSEVOICE_BATCH_WAIT_MS if wait_ms is None else wait_ms) / 1000
+        self._queue = []
+        self._cond = threading.Condition()
+        threading.Thread(target=self._loop, name="SenseVoiceBatcher", daemon=True).start()
+
+    def transcribe(self, samples):
+        request = {"samples": samples, "done": threading.Event(), "text": "", "error": None}
+        with self._cond:
+            self._queue.append(request)
+            self._cond.notify()
+        request["done"].wait()
+        if request["error"]:
+            raise request["error"]
+        return request["text"]
+
+    def _loop(self):
+        apply_role(INFERENCE)
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.wait
+                while len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._queue[:self.max_batch]
+                self._queue = self._queue[self.max_batch:]
+
+            try:
+                texts = self.engine.infer([r["samples"] for r in batch])
+                for request, text in zip(batch, texts):
+                    request["text"] = text
+            except Exception as e:
+                for request in batch:
+                    request["error"] = e
+            finally:
+                for request in batch:
+                    request["done"].set()
+            if len(batch) > 1:
+                logger.debug(f"SenseVoice decoded a batch of {len(batch)} utterances.")
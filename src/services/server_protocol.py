@@ -0,0 +1,85 @@
+"""
+Wire protocol and credentials shared by the transcription server and RemoteProvider.
+
+Authentication uses multiprocessing.connection's HMAC challenge in both directions,
+with a random per-user key (see server_authkey). Nothing on the channel is pickled:
+every message is a send_bytes frame holding a JSON header, and audio follows as one
+raw PCM frame.
+
+    client -> {"type": "transcribe", "id": ..., "dtype": "<i2"|"<f4", "sample_rate": ...}  + PCM frame
+    server -> {"type": "result", "id": ..., "text": ...}  or  {"type": "error", "id": ..., "message": ...}
+    client -> {"type": "ping"}                            server -> {"type": "pong", "provider": ...}
+"""
+import os
+import json
+import time
+import secrets
+from src.config import config
+from src.utils.logger import logger
+
+SAMPLE_DTYPES = ("<i2", "<f4")  # The only sample formats accepted from the wire
+MAX_HEADER_BYTES = 64 * 1024
+MAX_AUDIO_BYTES = 3600 * 16000 * 4  # One hour of 16 kHz float32
+MIN_KEY_CHARS = 32
+KEY_READ_ATTEMPTS = 20
+
+def server_authkey():
+    """
+    AIINPUT_SERVER_KEY if set; otherwise the key in STT_SERVER_KEY_FILE, created with
+    32 random bytes on first use and readable only by the current user.
+    Never returns a short or empty key: that would turn the HMAC challenge off.
+    """
+    if config.STT_SERVER_AUTHKEY:
+        if len(config.STT_SERVER_AUTHKEY) < MIN_KEY_CHARS:
+            raise ValueError(f"AIINPUT_SERVER_KEY must be at least {MIN_KEY_CHARS} characters")
+        return config.STT_SERVER_AUTHKEY
+    path = config.STT_SERVER_KEY_FILE
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    for _ in range(KEY_READ_ATTEMPTS):
+        key = _read_key(path)
+        if key is not None and len(key) >= MIN_KEY_CHARS:
+            return key
+        if key is None:
+            key = secrets.token_hex(32).encode("utf-8")
+            try:
+                # O_EXCL: if the app and the server race here, the loser reads the winner's key.
+                # 0o600 on POSIX; on Windows the file inherits the user-only ACL of the profile directory.
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                continue
+            with os.fdopen(fd, "wb") as f:
+                f.write(key)
+            logger.info(f"Generated transcription server key in {path}")
+            return key
+        time.sleep(0.05)  # Created but not written yet by the other process
+    # Still short after the retries: left behind by a crash between create and write
+    logger.warning(f"Transcription server key in {path} is invalid; generating a new one.")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(secrets.token_hex(32).encode("utf-8"))
+    os.replace(temp_path, path)
+    key = _read_key(path)  # If both sides regenerated, agree on whichever replace landed last
+    if key is None or len(key) < MIN_KEY_CHARS:
+        raise RuntimeError(f"Could not create a transcription server key in {path}")
+    return key
+
+def _read_key(path):
+    """The stripped key file contents, or None if the file does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+def send_message(conn, payload=None, **header):
+    """Send a JSON header frame, followed by `payload` as a raw frame if given."""
+    conn.send_bytes(json.dumps(header, ensure_ascii=False).encode("utf-8"))
+    if payload is not None:
+        conn.send_bytes(payload)
+
+def recv_message(conn):
+    header = json.loads(conn.recv_bytes(MAX_HEADER_BYTES).decode("utf-8"))
+    if not isinstance(header, dict) or not isinstance(header.get("type"), str):
+        raise ValueError("Malformed message header")
+    return header
@@ -0,0 +1,231 @@
+"""
+Incremental transcription sessions.
+Audio chunks are fed in from the recorder thread while the hotkey is held; a worker
+thread decodes finished segments in the background so that release only has to
+flush the last partial segment.
+"""
+import threading
+import traceback
+from src.config import config
+from src.utils.logger import logger
+from src.utils.audio import int16_to_float32, find_quiet_split
+from src.services.audio_buffer import AudioRingBuffer
+from src.utils.scheduling import apply_role, INFERENCE
+
+class StreamingSession:
+    """
+    Base session: buffers chunks and hands them to `_step` on a worker thread.
+    Chunks are copied into a growable AudioRingBuffer as they arrive; `_pending` is a
+    zero-copy view of the audio not yet committed, up to what the worker has taken.
+    """
+    separator = ""
+    # Optional VoiceActivityDetector applied before one-shot recognition of a segment
+    vad = None
+    # Optional callback(text) with the running hypothesis, called from the worker thread
+    on_partial = None
+
+    def __init__(self, sample_rate=None):
+        self.sample_rate = sample_rate or config.SAMPLE_RATE
+        self._audio = AudioRingBuffer(self.sample_rate * config.RECORD_BUFFER_SECONDS)
+        self._view = self._audio.view()  # Audio the worker has taken, as of its last wake-up
+        self._start = 0                   # Samples already committed or dropped
+        self._committed = []
+        self._finished = False
+        self._cancelled = False
+        self._last_partial = ""
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def _pending(self):
+        return self._view[self._start:]
+
+    @property
+    def pending_seconds(self):
+        return len(self._pending) / self.sample_rate
+
+    @property
+    def text(self):
+        return self.separator.join(t for t in self._committed if t).strip()
+
+    def feed(self, data):
+        """Called from the recording thread with one int16 chunk (raw PCM bytes or an array); copied here."""
+        with self._cond:
+            if self._finished:
+                return
+            self._audio.write(data)
+            self._cond.notify()
+
+    def finish(self, timeout=None):
+        """Stop accepting audio, decode whatever is left and return the full text."""
+        with self._cond:
+            self._finished = True
+            self._cond.notify()
+        self._thread.join(timeout)
+        return self.text
+
+    def cancel(self):
+        """Stop accepting audio and discard anything not yet decoded."""
+        with self._cond:
+            self._finished = True
+            self._cancelled = True
+            self._cond.notify()
+
+    def _run(self):
+        # Sessions are opened from the hotkey callback; don't decode with its policy
+        apply_role(INFERENCE)
+        while True:
+            with self._cond:
+                while len(self._audio) == len(self._view) and not self._finished:
+                    self._cond.wait()
+                # Later writes only append (or move to a grown copy), so the view stays valid
+                self._view = self._audio.view()
+                final = self._finished
+                if self._cancelled:
+                    break
+
+            try:
+                self._step(final)
+            except Exception as e:
+                logger.error(f"Streaming decode error: {e}")
+                logger.debug(traceback.format_exc())
+
+            if final:
+                break
+
+    def _commit(self, text, n_samples):
+        """Record finalized text and drop the audio it covered."""
+        self._committed.append(text.strip())
+        self._drop(n_samples)
+
+    def _drop(self, n_samples):
+        """Discard the first `n_samples` of pending audio."""
+        self._start = min(len(self._view), self._start + n_samples)
+
+    def _step(self, final):
+        raise NotImplementedError
+
+    def _emit_partial(self, text):
+        """Report the current hypothesis (committed + tentative text) if it changed."""
+        text = text.strip()
+        if self.on_partial and text != self._last_partial:
+            self._last_partial = text
+            try:
+                self.on_partial(text)
+            except Exception as e:
+                logger.debug(f"Partial result callback failed: {e}")
+
+    def _recognize(self, samples):
+        """One-shot recognition of a finished segment, skipping it if VAD finds no speech."""
+        if self.vad:
+            samples = self.vad.process(samples)
+            if samples is None:
+                return ""
+        return self.provider.transcribe(samples)
+
+class BufferedSession(StreamingSession):
+    """
+    Fallback for providers without incremental support: decode everything on finish.
+    Providers that are cheap enough (`fast_partials = True`) also re-decode the
+    in-progress buffer every STREAM_STEP_SECONDS to produce partial results.
+    """
+
+    def __init__(self, provider, sample_rate=None):
+        self.provider = provider
+        self._decoded_at = 0
+        super().__init__(sample_rate)
+
+    def _step(self, final):
+        if final:
+            if len(self._pending):
+                self._commit(self._recognize(self._pending), len(self._pending))
+            return
+
+        if not self.on_partial or not self.provider.fast_partials:
+            return
+        if len(self._pending) - self._decoded_at >= config.STREAM_STEP_SECONDS * self.sample_rate:
+            self._decoded_at = len(self._pending)
+            self._emit_partial(self._recognize(self._pending))
+
+class WhisperSession(StreamingSession):
+    """
+    Sliding-window Whisper decoding.
+    Segments that end well before the live edge are committed and their audio dropped;
+    the tail stays tentative and is re-decoded with more context on the next pass.
+    """
+    separator = " "
+
+    def __init__(self, provider, sample_rate=None):
+        self.provider = provider
+        self._decoded_at = 0
+        super().__init__(sample_rate)
+
+    def _step(self, final):
+        sr = self.sample_rate
+        if final:
+            pending = self._pending
+            if self.provider.longform and self.provider.longform.applies(pending):
+                # Decoding fell behind the recording: split the backlog across the model's workers
+                self._commit(self.provider.longform.transcribe(pending), len(pending))
+            elif len(pending) >= sr * 0.1:
+                segments = self.provider.transcribe_segments(int16_to_float32(pending), self._prompt())
+                for s in segments:
+                    self._committed.append(s.text.strip())
+            self._drop(len(pending))
+            return
+
+        new_audio = len(self._pending) - self._decoded_at
+        if new_audio < config.STREAM_STEP_SECONDS * sr:
+            return
+
+        window = int(config.STREAM_WINDOW_SECONDS * sr)
+        audio = self._pending[:window]
+        segments = self.provider.transcribe_segments(int16_to_float32(audio), self._prompt())
+        self._decoded_at = len(self._pending)
+        if not segments:
+            return
+
+        stable_until = len(audio) / sr - config.STREAM_TAIL_SECONDS
+        stable = [s for s in segments if s.end <= stable_until]
+        # Window is full but nothing is stable (one long segment): force progress
+        if not stable and len(self._pending) >= window:
+            stable = segments[:-1] or segments
+
+        if stable:
+            cut = min(len(self._pending), int(stable[-1].end * sr))
+            self._commit(" ".join(s.text.strip() for s in stable), cut)
+            self._decoded_at = max(0, self._decoded_at - cut)
+
+        tentative = " ".join(s.text.strip() for s in segments[len(stable):])
+        self._emit_partial(f"{self.text} {tentative}")
+
+    def _prompt(self):
+        return self._committed[-1] if self._committed else None
+
+class SegmentedSession(StreamingSession):
+    """
+    Cuts the stream at quiet points into segments of roughly STREAM_SEGMENT_SECONDS
+    and recognizes each one with a one-shot request while recording continues.
+    """
+
+    def __init__(self, provider, sample_rate=None):
+        self.provider = provider
+        super().__init__(sample_rate)
+
+    def _step(self, final):
+        sr = self.sample_rate
+        if final:
+            if len(self._pending) >= sr * 0.1:
+                self._commit(self._recognize(self._pending), len(self._pending))
+            return
+
+        segment_len = int(config.STREAM_SEGMENT_SECONDS * sr)
+        if len(self._pending) < segment_len:
+            return
+
+        # Look for a pause in the last 40% of the segment
+        split = find_quiet_split(self._pending, int(segment_len * 0.6), segment_len)
+        segment = self._pending[:split]
+        self._commit(self._recognize(segment), split)
+        self._emit_partial(self.text)
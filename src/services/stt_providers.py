@@ -3,46 +3,236 @@ import json
 import uuid
 import threading
 import time
-import traceback
-import gzip
-import struct
+import base64
+import sys
+import subprocess
+from multiprocessing.connection import Client
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 from src.utils.logger import logger
+from src.utils.http_client import http_client
+from src.utils.audio import load_audio, as_float32, encode_audio, warmup_audio
+from src.services.streaming import BufferedSession, WhisperSession, SegmentedSession
+from src.services.volc_streaming import VolcWebSocketSession
+from src.services.longform import LongFormRunner
+from src.utils.scheduling import apply_role, INFERENCE
 
 class BaseSTTProvider(ABC):
+    # Cheap enough to re-decode the in-progress buffer for partial results (see BufferedSession)
+    fast_partials = False
+
     @abstractmethod
-    def transcribe(self, audio_path: str) -> str:
+    def transcribe(self, audio) -> str:
+        """
+        Transcribe one utterance.
+        `audio` is either a WAV file path or a NumPy int16/float32 sample array
+        (typically a zero-copy view over the recorder's buffer).
+        """
+        pass
+
+    def create_stream(self):
+        """Return a StreamingSession that is fed audio chunks while recording."""
+        return BufferedSession(self)
+
+    def prewarm(self):
+        """Called on hotkey press, before any audio exists. Remote providers open connections here."""
+        pass
+
+    def warm_up(self):
+        """Called once after loading. Local engines run a throwaway inference so the first utterance doesn't pay lazy initialization."""
         pass
 
+    def correct_async(self, audio, callback):
+        """
+        Two-tier providers re-transcribe `audio` with a slower, more accurate model in the
+        background and call callback(text). Returns True if a correction was scheduled.
+        """
+        return False
+
+def download_whisper_model(model_input, base_dir):
+    """Resolve a Hugging Face repo id to a local copy under models/ (downloaded once)."""
+    import huggingface_hub
+    if "/" in model_input and not os.path.exists(model_input):
+        try:
+            local_name = model_input.replace("/", "--")
+            local_path = os.path.join(base_dir, "models", local_name)
+            if os.path.exists(local_path): return local_path
+            downloaded_path = huggingface_hub.snapshot_download(repo_id=model_input, local_dir=local_path, local_dir_use_symlinks=False)
+            return downloaded_path
+        except Exception: return model_input
+    return model_input
+
 class WhisperProvider(BaseSTTProvider):
-    def __init__(self, config):
+    def __init__(self, config, model_size=None, beam_size=None):
+        """`model_size` and `beam_size` override both config and the calibration (used by CascadeProvider)."""
+        self.config = config
+        settings = self._settings()
+        if model_size:
+            settings["model_size"] = model_size
+        if beam_size:
+            settings["beam_size"] = beam_size
+        self.model_path = download_whisper_model(settings["model_size"], config.BASE_DIR)
+        self.compute_type = settings["compute_type"]
+        workers = config.WHISPER_NUM_WORKERS
+        cores = os.cpu_count() or 4
+        cpu_threads = settings["cpu_threads"]
+        if workers > 1 and config.DEVICE == "cpu" and (not cpu_threads or cpu_threads * workers > cores):
+            # Split the cores between workers instead of oversubscribing them
+            cpu_threads = max(1, cores // workers)
+        self.beam_size = settings["beam_size"]
+        self.without_timestamps = settings["without_timestamps"]
+        logger.info(f"Loading Faster-Whisper model '{settings['model_size']}' ({self.compute_type}) on "
+                    f"{config.DEVICE} ({workers} worker(s), {cpu_threads or 'default'} threads each, "
+                    f"beam {self.beam_size})...")
+        self.model = self._load_model(workers, cpu_threads)
+        # Long recordings are split into chunks decoded concurrently on this model's workers
+        self.longform = (LongFormRunner(self._transcribe_samples, workers)
+                         if config.LONGFORM_ENABLED and workers > 1 else None)
+
+    def _load_model(self, workers, cpu_threads):
         from faster_whisper import WhisperModel
+        return WhisperModel(self.model_path, device=self.config.DEVICE, compute_type=self.compute_type,
+                            cpu_threads=cpu_threads, num_workers=workers)
+
+    def _settings(self):
+        """Engine settings from config, overridden by this machine's calibration (see whisper_tuner.py)."""
+        config = self.config
+        settings = {
+            "model_size": config.MODEL_SIZE,
+            "compute_type": config.WHISPER_COMPUTE_TYPE or ("int8" if config.DEVICE == "cpu" else "float16"),
+            "cpu_threads": config.WHISPER_CPU_THREADS,
+            "beam_size": config.WHISPER_BEAM_SIZE,
+            "without_timestamps": config.WHISPER_WITHOUT_TIMESTAMPS,
+        }
+        if config.WHISPER_AUTOTUNE and config.DEVICE == "cpu":
+            from src.services.whisper_tuner import load_tuning
+            tuned = load_tuning()
+            if tuned:
+                logger.info("Using calibrated Whisper settings for this machine.")
+                for key in settings:
+                    # An explicit thread count in config still wins
+                    if key in tuned and not (key == "cpu_threads" and config.WHISPER_CPU_THREADS):
+                        settings[key] = tuned[key]
+        return settings
+
+    def transcribe(self, audio):
+        if self.longform and not isinstance(audio, str):
+            samples = load_audio(audio)
+            if self.longform.applies(samples):
+                return self.longform.transcribe(samples)
+        return self._transcribe_samples(audio)
+
+    def _transcribe_samples(self, audio):
+        if not isinstance(audio, str):
+            audio = as_float32(audio)
+        segments, _ = self.model.transcribe(audio, language=self.config.LANGUAGE, vad_filter=True,
+                                            beam_size=self.beam_size, without_timestamps=self.without_timestamps)
+        return " ".join([s.text for s in segments]).strip()
+
+    def iter_segments(self, audio, initial_prompt=None):
+        """Lazily decode audio, yielding segments (with timestamps) as they are produced."""
+        segments, _ = self.model.transcribe(
+            as_float32(audio),
+            language=self.config.LANGUAGE,
+            vad_filter=True,
+            beam_size=self.beam_size,
+            initial_prompt=initial_prompt
+        )
+        return segments
+
+    def transcribe_segments(self, audio, initial_prompt=None):
+        """Decode a float32 sample array and return the list of segments (with timestamps)."""
+        return list(self.iter_segments(audio, initial_prompt))
+
+    def create_stream(self):
+        return WhisperSession(self)
+
+    def warm_up(self):
+        # No VAD filter: the synthetic clip must reach the encoder and decoder
+        segments, _ = self.model.transcribe(as_float32(warmup_audio()), language=self.config.LANGUAGE,
+                                            vad_filter=False)
+        list(segments)
+
+class CascadeProvider(BaseSTTProvider):
+    """
+    Two-tier Whisper: a small model (CASCADE_FAST_MODEL, greedy) answers immediately and
+    the configured MODEL_SIZE re-transcribes the same audio in the background. The caller
+    decides whether the accurate text replaces what was already injected.
+    """
+    def __init__(self, config):
         self.config = config
-        model_path = self._download_if_needed(config.MODEL_SIZE)
-        compute_type = "int8" if config.DEVICE == "cpu" else "float16"
-        logger.info(f"Loading Faster-Whisper model '{config.MODEL_SIZE}' on {config.DEVICE}...")
-        self.model = WhisperModel(model_path, device=config.DEVICE, compute_type=compute_type)
-
-    def _download_if_needed(self, model_input):
-        import huggingface_hub
-        if "/" in model_input and not os.path.exists(model_input):
+        self.fast = WhisperProvider(config, model_size=config.CASCADE_FAST_MODEL, beam_size=1)
+        self.accurate = WhisperProvider(config)
+        # One at a time: corrections must not compete with the next utterance's fast pass for cores
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CascadeCorrect",
+                                        initializer=apply_role, initargs=(INFERENCE,))
+
+    def transcribe(self, audio):
+        return self.fast.transcribe(audio)
+
+    def create_stream(self):
+        return WhisperSession(self.fast)
+
+    def warm_up(self):
+        self.fast.warm_up()
+        self.accurate.warm_up()
+
+    def correct_async(self, audio, callback):
+        def run():
             try:
-                local_name = model_input.replace("/", "--")
-                local_path = os.path.join(self.config.BASE_DIR, "models", local_name)
-                if os.path.exists(local_path): return local_path
-                downloaded_path = huggingface_hub.snapshot_download(repo_id=model_input, local_dir=local_path, local_dir_use_symlinks=False)
-                return downloaded_path
-            except Exception: return model_input
-        return model_input
-
-    def transcribe(self, audio_path):
-        segments, _ = self.model.transcribe(audio_path, language=self.config.LANGUAGE, vad_filter=True)
-        return " ".join([s.text for s in segments]).strip()
+                callback(self.accurate.transcribe(audio))
+            except Exception as e:
+                logger.error(f"Cascade correction failed: {e}")
+        self._pool.submit(run)
+        return True
+
+class Base64JsonBody:
+    """
+    Streaming JSON request body with one base64-encoded binary field.
+    The body is produced in small pieces while it is sent, so neither the base64
+    string nor the serialized JSON is ever materialized. It is re-iterable (safe for
+    retries) and has a known length, so requests sends a Content-Length header.
+    """
+    PLACEHOLDER = "\x00BASE64\x00"
+    CHUNK = 3 * 16384  # Multiple of 3: base64 pieces concatenate without padding
+
+    def __init__(self, payload, buffers):
+        # `payload` must contain PLACEHOLDER exactly once, where the data goes
+        prefix, suffix = json.dumps(payload, ensure_ascii=False).split(json.dumps(self.PLACEHOLDER)[1:-1])
+        self.prefix = prefix.encode("utf-8")
+        self.suffix = suffix.encode("utf-8")
+        self.buffers = [memoryview(b).cast('B') for b in buffers]
+        self.data_size = sum(len(b) for b in self.buffers)
+
+    def __len__(self):
+        return len(self.prefix) + 4 * ((self.data_size + 2) // 3) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        carry = b""
+        for buf in self.buffers:
+            start = 0
+            if carry:
+                # Complete the 3-byte group left over from the previous buffer
+                start = 3 - len(carry)
+                carry += bytes(buf[:start])
+                if len(carry) < 3:
+                    continue
+                yield base64.b64encode(carry)
+                carry = b""
+            end = start + (len(buf) - start) // 3 * 3
+            for pos in range(start, end, self.CHUNK):
+                yield base64.b64encode(buf[pos:min(pos + self.CHUNK, end)])
+            carry = bytes(buf[end:])
+        if carry:
+            yield base64.b64encode(carry)
+        yield self.suffix
 
 class VolcengineProvider(BaseSTTProvider):
     """
-    Volcengine (Doubao) Streaming ASR Provider.
-    Uses WebSocket binary protocol for real-time speech recognition.
+    Volcengine (Doubao) ASR Provider.
+    Streaming mode uses the WebSocket binary protocol (see volc_streaming.py) so audio
+    is recognized while recording; whole clips use the one-shot Flash HTTP API.
     """
     def __init__(self, config):
         self.config = config
@@ -50,25 +240,30 @@ class VolcengineProvider(BaseSTTProvider):
         self.token = config.VOLC_ACCESS_KEY
         self.cluster = config.VOLC_CLUSTER
 
-    def transcribe(self, audio_path):
+    def transcribe(self, audio):
         if not self.appid: 
             return "(火山引擎 AppID 未配置)"
         
         # Flash/Turbo API is the only one supporting Base64 upload for Big Model
-        return self._transcribe_flash(audio_path)
+        return self._transcribe_flash(load_audio(audio))
+
+    def create_stream(self):
+        if self.config.VOLC_STREAMING_MODE == "websocket" and self.appid:
+            return VolcWebSocketSession(self)
+        # Pause-aligned segments go to the Flash API while recording
+        return SegmentedSession(self)
 
-    def _transcribe_flash(self, audio_path):
+    def prewarm(self):
+        http_client.prewarm(self.config.VOLC_FLASH_URL)
+
+    def _transcribe_flash(self, samples):
         """
         Volcengine Flash (Turbo) API.
         Endpoint: /api/v3/auc/bigmodel/recognize/flash
         Resource ID: volc.bigasr.auc_turbo
         Supports: Base64 audio upload (audio.data).
         """
-        import requests
-        import base64
-        import uuid
-        
-        url = "https://openspeech.bytedance.com/api/v3/auc/bigmodel/recognize/flash"
+        url = self.config.VOLC_FLASH_URL
         req_id = str(uuid.uuid4())
         
         # Flash API requires this specific resource ID
@@ -84,18 +279,17 @@ class VolcengineProvider(BaseSTTProvider):
         }
         
         try:
-            with open(audio_path, "rb") as f:
-                audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+            audio_format, buffers = encode_audio(samples, self.config.VOLC_UPLOAD_CODEC)
             
             payload = {
                 "user": {"uid": "aiinput_user"},
                 "audio": {
-                    "format": "wav",
+                    "format": audio_format,
                     "rate": 16000,
                     "bits": 16,
                     "channel": 1,
                     # Flash API specifically supports 'data' for Base64
-                    "data": audio_base64
+                    "data": Base64JsonBody.PLACEHOLDER
                 },
                 "request": {
                     "model_name": "bigmodel",
@@ -105,8 +299,11 @@ class VolcengineProvider(BaseSTTProvider):
                 }
             }
             
-            logger.info(f"Volc Flash Request: {req_id}")
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            body = Base64JsonBody(payload, buffers)
+            logger.info(f"Volc Flash Request: {req_id} ({audio_format}, {body.data_size} bytes)")
+            response = http_client.post(url, endpoint="volc_flash", headers=headers, data=body)
+            logger.info(f"Volc Flash timing: connect {response.connect_time * 1000:.0f} ms, "
+                        f"server {response.server_time * 1000:.0f} ms")
             
             # Check headers for API status
             status_code = response.headers.get("X-Api-Status-Code", "")
@@ -127,17 +324,114 @@ class VolcengineProvider(BaseSTTProvider):
             logger.error(f"Volcengine Flash error: {e}")
             return f"(Request Error: {e})"
 
-def get_provider(config):
+class RemoteProvider(BaseSTTProvider):
+    """
+    Client for the transcription server (see transcription_server.py).
+    The model lives in a separate long-lived process; each utterance's samples are
+    sent over an authenticated local socket and the text comes back in one reply.
+    """
+    def __init__(self, config):
+        self.config = config
+        self._conn = None
+        self._lock = threading.Lock()
+        self._connect()
+
+    def _connect(self):
+        from src.services.server_protocol import server_authkey, send_message, recv_message
+        authkey = server_authkey()
+        try:
+            self._conn = Client(self.config.STT_SERVER_ADDRESS, authkey=authkey)
+        except OSError:
+            if not self.config.STT_SERVER_AUTOSTART:
+                raise
+            self._spawn_server()
+            deadline = time.monotonic() + self.config.STT_SERVER_START_TIMEOUT
+            while True:
+                try:
+                    self._conn = Client(self.config.STT_SERVER_ADDRESS, authkey=authkey)
+                    break
+                except OSError:
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.25)
+        send_message(self._conn, type="ping")
+        provider_name = recv_message(self._conn).get("provider")
+        logger.info(f"Connected to transcription server at {self.config.STT_SERVER_ADDRESS} ({provider_name}).")
+
+    def _spawn_server(self):
+        """Start a detached server process that outlives this app."""
+        if getattr(sys, 'frozen', False):
+            cmd = [sys.executable, "--stt-server"]
+        else:
+            cmd = [sys.executable, "-m", "src.services.transcription_server"]
+        kwargs = {"cwd": self.config.BASE_DIR, "stdin": subprocess.DEVNULL,
+                  "stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if sys.platform == 'win32':
+            kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        logger.info("Starting transcription server process...")
+        subprocess.Popen(cmd, **kwargs)
+
+    def transcribe(self, audio):
+        samples = load_audio(audio)
+        request_id = str(uuid.uuid4())
+        with self._lock:
+            try:
+                return self._request(request_id, samples)
+            except (EOFError, OSError) as e:
+                # Server restarted or connection dropped: reconnect once and retry
+                logger.warning(f"Transcription server connection lost ({e}), reconnecting...")
+                self._connect()
+                return self._request(request_id, samples)
+
+    def _request(self, request_id, samples):
+        from src.services.server_protocol import send_message, recv_message
+        # load_audio always yields int16; the server only accepts the formats in SAMPLE_DTYPES
+        send_message(self._conn, memoryview(samples).cast('B'), type="transcribe", id=request_id,
+                     dtype=samples.dtype.str, sample_rate=self.config.SAMPLE_RATE)
+        while True:
+            message = recv_message(self._conn)
+            if message.get("id") != request_id:
+                continue
+            if message["type"] == "result":
+                return message.get("text", "")
+            return f"(Transcription server error: {message.get('message')})"
+
+def get_provider(config, local=False):
+    """`local=True` always builds an in-process engine (used by the transcription server itself)."""
+    if config.STT_SERVER_ENABLED and not local:
+        return RemoteProvider(config)
     if config.STT_PROVIDER == "volcengine":
         return VolcengineProvider(config)
     elif config.STT_PROVIDER == "sensevoice":
         return SenseVoiceProvider(config)
+    elif config.CASCADE_ENABLED and not local:
+        return CascadeProvider(config)
     else:
         return WhisperProvider(config)
 
 class SenseVoiceProvider(BaseSTTProvider):
+    """
+    Local SenseVoiceSmall (ONNX Runtime). Non-autoregressive, so it is much faster
+    than Whisper on CPU; concurrent utterances are decoded together in one batch.
+    """
+    fast_partials = True
     def __init__(self, config):
+        from src.services.sensevoice_engine import SenseVoiceEngine, BatchingEngine
         self.config = config
-        logger.info("SenseVoiceSmall (ONNX) is ready to be implemented locally.")
-    def transcribe(self, audio_path):
-        return "(SenseVoice 引擎集成中，建议先使用 volcengine 模式体验高精度)"
+        model_dir = os.path.join(config.BASE_DIR, "models", config.SENSEVOICE_MODEL_DIR)
+        engine = SenseVoiceEngine(model_dir, device=config.DEVICE, threads=config.SENSEVOICE_THREADS)
+        self.engine = BatchingEngine(engine)
+        # Concurrent chunks of a long recording land in the same padded batch
+        self.longform = (LongFormRunner(self.engine.transcribe, config.SENSEVOICE_BATCH_SIZE)
+                         if config.LONGFORM_ENABLED else None)
+
+    def transcribe(self, audio):
+        samples = load_audio(audio)
+        if self.longform and self.longform.applies(samples):
+            return self.longform.transcribe(samples)
+        return self.engine.transcribe(samples)
+
+    def warm_up(self):
+        self.engine.transcribe(warmup_audio())
@@ -1,45 +1,189 @@
 import time
 import sys
+import threading
 import pyperclip
 from pynput.keyboard import Controller, Key
+from src.config import config
 from src.utils.logger import logger
+from src.utils.tracing import NULL_TRACE
+
+def foreground_window():
+    """Handle of the focused window, or None where it cannot be determined."""
+    if sys.platform != 'win32':
+        return None
+    try:
+        import ctypes
+        return ctypes.windll.user32.GetForegroundWindow() or None
+    except Exception:
+        return None
 
 class TextInjector:
+    """
+    Types results into the focused window.
+    Short strings can be typed as keystrokes; everything else is pasted through the
+    clipboard. The clipboard write is confirmed by polling instead of a fixed sleep, and
+    the user's clipboard is restored later on a timer, so the caller returns as soon as
+    the paste is sent. Back-to-back injections share one pending restore.
+    The last injection can be replaced (replace_last) while the user has not typed or
+    switched windows since.
+    """
+
     def __init__(self):
         self.keyboard = Controller()
+        self._lock = threading.RLock()
+        self._saved_clipboard = None  # The user's clipboard while ours is on it
+        self._injected = None
+        self._restore_timer = None
+        self._generation = 0
+        self._pending_traces = []  # Traces waiting for the clipboard restore
+        self._last_text = None  # The last injection, while it is still safe to replace
+        self._last_window = None
+        self._last_time = 0.0
+        self._user_input_at = 0.0  # Written by the keyboard hook without locking
 
-    def type_text(self, text):
+    def type_text(self, text, trace=NULL_TRACE):
         if not text:
+            trace.finish()
             return
-        
+
         try:
+            if self._should_type(text):
+                logger.info(f"Injecting text via keystrokes: {text}")
+                with self._lock:
+                    self.keyboard.type(text)
+                    self._remember(text)
+                trace.mark("paste")
+                trace.annotate(inject="type")
+                trace.finish()
+                return
+
             logger.info(f"Injecting text via Clipboard: {text}")
-            
-            # 1. Backup current clipboard
-            try:
-                original_clipboard = pyperclip.paste()
-            except Exception:
-                original_clipboard = ""
-            
-            # 2. Copy new text to clipboard
-            pyperclip.copy(text)
-            
-            # 3. Short wait to ensure clipboard update
-            time.sleep(0.1) 
-            
-            # 4. Simulate Paste command (Cmd+V on macOS, Ctrl+V on others)
-            paste_key = Key.cmd if sys.platform == 'darwin' else Key.ctrl
-            with self.keyboard.pressed(paste_key):
-                self.keyboard.press('v')
-                self.keyboard.release('v')
-            
-            logger.debug("Clipboard paste command sent.")
-
-            # 5. Restore original clipboard (delayed to allow paste to finish)
-            # We use a slight delay so the paste has time to be read by the target app
-            time.sleep(0.5)
-            pyperclip.copy(original_clipboard)
-            logger.debug("Clipboard restored.")
-            
+            with self._lock:
+                # 1. Back up the clipboard, unless it still holds our previous injection
+                try:
+                    current = pyperclip.paste()
+                except Exception:
+                    current = ""
+                if self._saved_clipboard is None or current != self._injected:
+                    self._saved_clipboard = current
+
+                # 2. Copy new text and wait until the clipboard actually has it
+                pyperclip.copy(text)
+                self._injected = text
+                self._wait_for_clipboard(text)
+
+                # 3. Simulate Paste command (Cmd+V on macOS, Ctrl+V on others)
+                paste_key = Key.cmd if sys.platform == 'darwin' else Key.ctrl
+                with self.keyboard.pressed(paste_key):
+                    self.keyboard.press('v')
+                    self.keyboard.release('v')
+                logger.debug("Clipboard paste command sent.")
+                self._remember(text)
+                trace.mark("paste")
+                trace.annotate(inject="clipboard")
+                self._pending_traces.append(trace)
+
+                # 4. Restore the original clipboard once the target app has read it
+                self._schedule_restore()
+
         except Exception as e:
             logger.error(f"Error during text injection: {e}")
+            trace.finish()
+
+    def _remember(self, text):
+        # Called with the lock held, after the keystrokes were sent
+        self._last_text = text
+        self._last_window = foreground_window()
+        self._last_time = time.monotonic()
+
+    def note_user_input(self):
+        """
+        A key was pressed; the user may have edited around our text. Called from the
+        low-level keyboard hook, so it only records a timestamp: the OS removes hooks that
+        block, and the injection lock can be held for a whole paste.
+        """
+        self._user_input_at = time.monotonic()
+
+    def replace_last(self, old, new, max_age=None):
+        """
+        Replace the just-injected `old` with `new` by deleting it with backspaces and injecting
+        again. Only done while `old` is still the last injection, the same window is focused
+        (verifiable on Windows only) and nothing was typed since. Returns True if replaced.
+        """
+        with self._lock:
+            if self._last_text is None or self._last_text != old:
+                return False
+            if max_age is not None and time.monotonic() - self._last_time > max_age:
+                return False
+            # Our own keystrokes reach the keyboard hook too, shortly after they are sent
+            if self._user_input_at > self._last_time + config.INJECT_ECHO_MS / 1000:
+                return False
+            window = foreground_window()
+            if window is None or window != self._last_window:
+                return False
+            try:
+                for _ in range(len(old)):
+                    self.keyboard.press(Key.backspace)
+                    self.keyboard.release(Key.backspace)
+            except Exception as e:
+                logger.error(f"Error deleting injected text: {e}")
+                self._last_text = None
+                return False
+            logger.info(f"Replacing injected text: {old} -> {new}")
+            self.type_text(new)
+            return True
+
+    def _should_type(self, text):
+        mode = config.INJECT_MODE
+        if mode == "type":
+            return True
+        return mode == "auto" and len(text) <= config.INJECT_TYPE_MAX_CHARS and "\n" not in text
+
+    def _wait_for_clipboard(self, text):
+        deadline = time.perf_counter() + config.CLIPBOARD_VERIFY_TIMEOUT_MS / 1000
+        while True:
+            try:
+                if pyperclip.paste() == text:
+                    return
+            except Exception:
+                pass
+            if time.perf_counter() >= deadline:
+                logger.warning("Clipboard update not confirmed in time, pasting anyway.")
+                return
+            time.sleep(config.CLIPBOARD_POLL_MS / 1000)
+
+    def _schedule_restore(self):
+        # Called with the lock held; a newer injection supersedes the pending restore
+        self._generation += 1
+        if self._restore_timer:
+            self._restore_timer.cancel()
+        self._restore_timer = threading.Timer(config.CLIPBOARD_RESTORE_DELAY_MS / 1000,
+                                              self._restore_clipboard, args=(self._generation,))
+        self._restore_timer.daemon = True
+        self._restore_timer.start()
+
+    def _restore_clipboard(self, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if self._saved_clipboard is None:
+                return
+            try:
+                # Leave it alone if the user copied something else in the meantime
+                if pyperclip.paste() == self._injected:
+                    pyperclip.copy(self._saved_clipboard)
+                    logger.debug("Clipboard restored.")
+            except Exception as e:
+                logger.error(f"Error restoring clipboard: {e}")
+            self._saved_clipboard = None
+            self._injected = None
+            for trace in self._pending_traces:
+                trace.mark("clipboard_restore")
+                trace.finish()
+            self._pending_traces = []
+
+    def close(self):
+        """Restore the clipboard now if a restore is still pending."""
+        if self._restore_timer:
+            self._restore_timer.cancel()
+        self._restore_clipboard()
@@ -1,6 +1,7 @@
 from src.config import config
 from src.utils.logger import logger
 from src.services.stt_providers import get_provider
+from src.services.vad import VoiceActivityDetector
 import traceback
 
 class Transcriber:
@@ -13,20 +14,87 @@ class Transcriber:
             logger.error(f"Failed to load STT Engine: {e}")
             logger.debug(traceback.format_exc())
             self.provider = None
+        self.vad = VoiceActivityDetector() if config.VAD_ENGINE else None
 
-    def transcribe(self, audio_path):
+    def transcribe(self, audio, on_correction=None):
+        """
+        `audio` may be a WAV path or an int16/float32 NumPy buffer.
+        With a two-tier provider, on_correction(text) is later called with the accurate transcript.
+        """
         try:
-            if not audio_path:
+            if audio is None or len(audio) == 0:
                 return ""
             
             if not self.provider:
                 logger.error("No STT provider available.")
                 return ""
 
-            text = self.provider.transcribe(audio_path)
+            if self.vad and not isinstance(audio, str):
+                audio = self.vad.process(audio)
+                if audio is None:
+                    logger.info("No speech detected, skipping STT.")
+                    return ""
+
+            text = self.provider.transcribe(audio)
             logger.info(f"Transcription result: {text}")
+            if on_correction and text and not self._is_error(text):
+                self._request_correction(audio, on_correction)
             return text
         except Exception as e:
             logger.error(f"Error during transcription: {e}")
             logger.debug(traceback.format_exc())
             return ""
+
+    def prewarm(self):
+        try:
+            if self.provider:
+                self.provider.prewarm()
+        except Exception as e:
+            logger.debug(f"Provider pre-warm failed: {e}")
+
+    def warm_up(self):
+        """One throwaway pass through VAD and the provider."""
+        if self.vad:
+            from src.utils.audio import warmup_audio
+            self.vad.process(warmup_audio())
+        self.provider.warm_up()
+
+    def start_stream(self):
+        """Open an incremental session for the current utterance, or None to fall back to whole-clip mode."""
+        if not self.provider or not config.STREAMING_ENABLED:
+            return None
+        try:
+            session = self.provider.create_stream()
+            session.vad = self.vad
+            return session
+        except Exception as e:
+            logger.error(f"Failed to start streaming session: {e}")
+            logger.debug(traceback.format_exc())
+            return None
+
+    def finish_stream(self, session, audio=None, on_correction=None):
+        """Finish a streaming session. `audio` (the full recording) is re-transcribed for corrections."""
+        try:
+            text = session.finish()
+            logger.info(f"Transcription result (streaming): {text}")
+            if on_correction and audio is not None and text and not self._is_error(text):
+                if self.vad:
+                    audio = self.vad.process(audio)
+                if audio is not None:
+                    self._request_correction(audio, on_correction)
+            return text
+        except Exception as e:
+            logger.error(f"Error during streaming transcription: {e}")
+            logger.debug(traceback.format_exc())
+            return ""
+
+    def _request_correction(self, audio, on_correction):
+        def corrected(text):
+            logger.info(f"Transcription result (accurate): {text}")
+            on_correction(text)
+        self.provider.correct_async(audio, corrected)
+
+    @staticmethod
+    def _is_error(text):
+        # Providers report failures as "(...)" placeholder text; never correct from those
+        return text.startswith("(") and text.endswith(")")
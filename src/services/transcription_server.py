@@ -0,0 +1,105 @@
+"""
+Transcription server mode.
+A long-lived process holds the STT model warm and serves transcription requests
+from one or more AIInput clients over an authenticated local socket. Inference
+therefore runs outside the Qt/pynput process, and the model survives app restarts.
+The wire protocol and the per-user key are described in server_protocol.py.
+
+Run standalone:   python -m src.services.transcription_server [--workers N]
+or let the app start it (STT_SERVER_AUTOSTART), which runs `main.py --stt-server`.
+"""
+import sys
+import threading
+import argparse
+import traceback
+from multiprocessing.connection import Listener
+import numpy as np
+from src.config import config
+from src.utils.logger import logger
+from src.services.stt_providers import get_provider
+from src.services.server_protocol import (server_authkey, send_message, recv_message,
+                                          SAMPLE_DTYPES, MAX_AUDIO_BYTES)
+from src.utils.scheduling import apply_process_role, INFERENCE
+
+class TranscriptionServer:
+    def __init__(self, workers=None):
+        self.workers = workers or config.WHISPER_NUM_WORKERS
+        self.provider = None
+        # The model is shared by all clients; the semaphore bounds concurrent inference
+        self._slots = threading.Semaphore(self.workers)
+        self._running = False
+
+    def serve_forever(self):
+        # Bind first so a second server fails fast instead of loading another model
+        with Listener(config.STT_SERVER_ADDRESS, authkey=server_authkey()) as listener:
+            config.WHISPER_NUM_WORKERS = self.workers
+            self.provider = get_provider(config, local=True)
+            try:
+                self.provider.warm_up()
+            except Exception as e:
+                logger.warning(f"Warm-up failed: {e}")
+            self._running = True
+            logger.info(f"Transcription server listening on {config.STT_SERVER_ADDRESS} "
+                        f"({config.STT_PROVIDER}, {self.workers} worker(s)).")
+            while self._running:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.error(f"Rejected client connection: {e}")
+                    continue
+                threading.Thread(target=self._serve_client, args=(conn,), daemon=True).start()
+
+    def _serve_client(self, conn):
+        logger.debug("Client connected.")
+        try:
+            while True:
+                message = recv_message(conn)
+                kind = message["type"]
+                if kind == "ping":
+                    send_message(conn, type="pong", provider=config.STT_PROVIDER)
+                elif kind == "transcribe":
+                    request_id = str(message.get("id"))
+                    dtype = message.get("dtype")
+                    data = conn.recv_bytes(MAX_AUDIO_BYTES)
+                    if dtype not in SAMPLE_DTYPES or message.get("sample_rate") != config.SAMPLE_RATE:
+                        send_message(conn, type="error", id=request_id, message="Unsupported audio format")
+                        continue
+                    self._handle_transcribe(conn, request_id, np.frombuffer(data, dtype=dtype))
+                else:
+                    logger.warning(f"Unknown request: {kind}")
+        except (EOFError, OSError):
+            logger.debug("Client disconnected.")
+        except ValueError as e:
+            # Undecodable JSON or a malformed header: drop the connection
+            logger.warning(f"Bad message from client: {e}")
+        finally:
+            conn.close()
+
+    def _handle_transcribe(self, conn, request_id, samples):
+        try:
+            with self._slots:
+                result = self.provider.transcribe(samples)
+            send_message(conn, type="result", id=request_id, text=result)
+        except (EOFError, OSError):
+            raise
+        except Exception as e:
+            logger.error(f"Server transcription error: {e}")
+            logger.debug(traceback.format_exc())
+            send_message(conn, type="error", id=request_id, message=str(e))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AIInput transcription server")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent inference workers sharing one model")
+    args, _ = parser.parse_known_args(argv)
+    # The whole process is inference: lower its priority and keep it off the reserved cores
+    apply_process_role(INFERENCE)
+    try:
+        TranscriptionServer(workers=args.workers).serve_forever()
+    except OSError as e:
+        # Address in use: another server already holds the model
+        logger.error(f"Transcription server could not start: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
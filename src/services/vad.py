@@ -0,0 +1,107 @@
+"""
+Provider-independent voice activity detection.
+Runs between the recorder and the STT provider: trims leading/trailing silence,
+compresses long internal pauses and lets the pipeline skip STT entirely when a
+clip contains no speech.
+"""
+import os
+import numpy as np
+from src.config import config
+from src.utils.logger import logger
+
+class EnergyVAD:
+    """Frame RMS against an adaptive noise floor. No model, negligible cost."""
+
+    def __init__(self, sample_rate):
+        self.frame_size = sample_rate * 30 // 1000
+
+    def speech_mask(self, samples):
+        n_frames = len(samples) // self.frame_size
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+        frames = samples[:n_frames * self.frame_size].reshape(n_frames, self.frame_size).astype(np.float32)
+        rms = np.sqrt(np.mean(np.square(frames / 32768.0), axis=1))
+        noise_floor = np.percentile(rms, 10)
+        # Relative to the noise floor, but never above a fraction of the peak (all-speech clips)
+        threshold = max(config.VAD_ENERGY_THRESHOLD, min(noise_floor * 3.0, rms.max() * 0.1))
+        return rms > threshold
+
+class SileroVAD:
+    """Silero VAD v5 (ONNX) through onnxruntime. Expects models/<VAD_SILERO_MODEL>."""
+    CONTEXT = 64
+
+    def __init__(self, sample_rate, model_path):
+        import onnxruntime
+        if sample_rate != 16000:
+            raise ValueError("Silero VAD is configured for 16 kHz audio")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        self.frame_size = 512
+        self.sample_rate = np.array(sample_rate, dtype=np.int64)
+
+    def speech_mask(self, samples):
+        n_frames = len(samples) // self.frame_size
+        audio = samples[:n_frames * self.frame_size].astype(np.float32) / 32768.0
+        state = np.zeros((2, 1, 128), dtype=np.float32)
+        context = np.zeros(self.CONTEXT, dtype=np.float32)
+        mask = np.zeros(n_frames, dtype=bool)
+        for i in range(n_frames):
+            frame = audio[i * self.frame_size:(i + 1) * self.frame_size]
+            x = np.concatenate([context, frame])[np.newaxis, :]
+            prob, state = self.session.run(None, {"input": x, "state": state, "sr": self.sample_rate})
+            context = frame[-self.CONTEXT:]
+            mask[i] = prob[0][0] > config.VAD_SILERO_THRESHOLD
+        return mask
+
+class VoiceActivityDetector:
+    def __init__(self, sample_rate=None):
+        self.sample_rate = sample_rate or config.SAMPLE_RATE
+        self.engine = self._create_engine(config.VAD_ENGINE)
+
+    def _create_engine(self, name):
+        if name == "silero":
+            model_path = os.path.join(config.BASE_DIR, "models", config.VAD_SILERO_MODEL)
+            try:
+                engine = SileroVAD(self.sample_rate, model_path)
+                logger.info("VAD: using Silero ONNX model.")
+                return engine
+            except Exception as e:
+                logger.warning(f"Silero VAD unavailable ({e}), falling back to energy VAD.")
+        return EnergyVAD(self.sample_rate)
+
+    def process(self, samples):
+        """
+        Return samples with silence trimmed and long pauses shortened,
+        or None if the clip contains no speech.
+        """
+        frame = self.engine.frame_size
+        mask = self.engine.speech_mask(samples)
+        if mask.sum() * frame < config.VAD_MIN_SPEECH_MS * self.sample_rate // 1000:
+            return None
+
+        # Pad speech regions so word onsets/tails are not clipped
+        pad = max(1, config.VAD_PAD_MS * self.sample_rate // 1000 // frame)
+        padded = np.convolve(mask.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), mode="same") > 0
+
+        # Speech runs as [start, end) frame ranges
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], padded.astype(np.int8), [0]])))
+        runs = edges.reshape(-1, 2)
+
+        max_gap = config.VAD_MAX_SILENCE_MS * self.sample_rate // 1000
+        pieces = []
+        for i, (start, end) in enumerate(runs):
+            s = start * frame
+            e = len(samples) if end == len(padded) else end * frame
+            pieces.append(samples[s:e])
+            if i + 1 < len(runs):
+                # Keep at most max_gap samples of each internal pause
+                gap_start = e
+                gap_end = runs[i + 1][0] * frame
+                pieces.append(samples[gap_start:min(gap_end, gap_start + max_gap)])
+
+        trimmed = np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+        logger.debug(f"VAD: {len(samples) / self.sample_rate:.2f}s -> {len(trimmed) / self.sample_rate:.2f}s")
+        return trimmed
@@ -0,0 +1,221 @@
+"""
+Volcengine (Doubao) big-model streaming ASR over WebSocket.
+
+Binary frame layout (all integers big-endian):
+    byte 0  protocol version (4 bits) | header size in 4-byte words (4 bits)
+    byte 1  message type (4 bits)     | message flags (4 bits)
+    byte 2  serialization (4 bits)    | compression (4 bits)
+    byte 3  reserved
+    [sequence: int32]   only if flags has the sequence bit
+    payload size: uint32, payload (gzip-compressed JSON or raw audio)
+Error frames carry an error code (uint32) before the payload size.
+"""
+import gzip
+import json
+import uuid
+import struct
+import threading
+import traceback
+import numpy as np
+from src.config import config
+from src.utils.scheduling import apply_role, BACKGROUND
+from src.utils.logger import logger
+from src.services.streaming import StreamingSession
+
+PROTOCOL_VERSION = 0b0001
+HEADER_WORDS = 0b0001
+
+# Message types
+FULL_CLIENT_REQUEST = 0b0001
+AUDIO_ONLY_REQUEST = 0b0010
+FULL_SERVER_RESPONSE = 0b1001
+SERVER_ERROR_RESPONSE = 0b1111
+
+# Message flags
+NO_SEQUENCE = 0b0000
+POS_SEQUENCE = 0b0001
+LAST_PACKET = 0b0010
+NEG_SEQUENCE = 0b0011
+
+# Serialization / compression
+NO_SERIALIZATION = 0b0000
+JSON_SERIALIZATION = 0b0001
+NO_COMPRESSION = 0b0000
+GZIP = 0b0001
+
+def build_header(message_type, flags=NO_SEQUENCE, serialization=JSON_SERIALIZATION, compression=GZIP):
+    return bytes([
+        (PROTOCOL_VERSION << 4) | HEADER_WORDS,
+        (message_type << 4) | flags,
+        (serialization << 4) | compression,
+        0x00,
+    ])
+
+def build_full_client_request(payload):
+    body = gzip.compress(json.dumps(payload).encode("utf-8"))
+    return build_header(FULL_CLIENT_REQUEST) + struct.pack(">I", len(body)) + body
+
+def build_audio_request(audio, last=False):
+    body = gzip.compress(audio)
+    flags = LAST_PACKET if last else NO_SEQUENCE
+    header = build_header(AUDIO_ONLY_REQUEST, flags, NO_SERIALIZATION, GZIP)
+    return header + struct.pack(">I", len(body)) + body
+
+def parse_frame(data):
+    """
+    Parse any frame of this protocol.
+    Returns a dict: message_type, flags, sequence, is_last, error_code, payload
+    (decompressed; JSON-decoded when serialized as JSON).
+    """
+    header_size = (data[0] & 0x0F) * 4
+    message_type = data[1] >> 4
+    flags = data[1] & 0x0F
+    serialization = data[2] >> 4
+    compression = data[2] & 0x0F
+    offset = header_size
+
+    frame = {
+        "message_type": message_type,
+        "flags": flags,
+        "sequence": None,
+        "is_last": bool(flags & LAST_PACKET),
+        "error_code": None,
+        "payload": None,
+    }
+    if flags & POS_SEQUENCE:
+        frame["sequence"] = struct.unpack(">i", data[offset:offset + 4])[0]
+        offset += 4
+    if message_type == SERVER_ERROR_RESPONSE:
+        frame["error_code"] = struct.unpack(">I", data[offset:offset + 4])[0]
+        offset += 4
+
+    size = struct.unpack(">I", data[offset:offset + 4])[0]
+    payload = data[offset + 4:offset + 4 + size]
+    if compression == GZIP and payload:
+        payload = gzip.decompress(payload)
+    if serialization == JSON_SERIALIZATION and payload:
+        payload = json.loads(payload.decode("utf-8"))
+    frame["payload"] = payload
+    return frame
+
+class VolcWebSocketSession(StreamingSession):
+    """
+    Streams live audio to the Volcengine WebSocket endpoint while recording.
+    The connection is opened on the worker thread (so the hotkey handler never waits
+    on the handshake), audio is sent as it arrives, and a reader thread tracks the
+    server's running result. On finish only the last packet is still in flight.
+    If the connection fails, the whole utterance falls back to the Flash API.
+    """
+
+    def __init__(self, provider, sample_rate=None):
+        self.provider = provider
+        self.ws = None
+        self.partial_text = ""
+        self._final_text = None
+        self._failed = False
+        self._closed = False
+        self._final_event = threading.Event()
+        self._sent = []
+        super().__init__(sample_rate)
+
+    def _connect(self):
+        import websocket
+        headers = [
+            f"X-Api-App-Key: {self.provider.appid}",
+            f"X-Api-Access-Key: {self.provider.token}",
+            f"X-Api-Resource-Id: {config.VOLC_WS_RESOURCE_ID}",
+            f"X-Api-Connect-Id: {uuid.uuid4()}",
+        ]
+        self.ws = websocket.create_connection(config.VOLC_WS_URL, header=headers,
+                                              timeout=config.VOLC_WS_FINAL_TIMEOUT)
+        # The reader blocks between results; finish() bounds the final wait itself
+        self.ws.settimeout(None)
+        self.ws.send_binary(build_full_client_request({
+            "user": {"uid": "aiinput_user"},
+            "audio": {"format": "pcm", "codec": "raw", "rate": self.sample_rate, "bits": 16, "channel": 1},
+            "request": {
+                "model_name": "bigmodel",
+                "enable_itn": True,
+                "enable_punc": True,
+                "result_type": "full",
+            },
+        }))
+        threading.Thread(target=self._read_loop, daemon=True).start()
+        logger.debug("Volc WebSocket session opened.")
+
+    def _read_loop(self):
+        apply_role(BACKGROUND)
+        try:
+            while True:
+                frame = parse_frame(self.ws.recv())
+                if frame["message_type"] == SERVER_ERROR_RESPONSE:
+                    raise RuntimeError(f"Volc WebSocket error [{frame['error_code']}]: {frame['payload']}")
+                result = (frame["payload"] or {}).get("result") or {}
+                if "text" in result:
+                    self.partial_text = result["text"]
+                    self._emit_partial(self.partial_text)
+                if frame["is_last"]:
+                    self._final_text = self.partial_text
+                    break
+        except Exception as e:
+            if not self._closed:
+                logger.error(f"Volc WebSocket receive failed: {e}")
+                self._failed = True
+        finally:
+            self._final_event.set()
+
+    def _step(self, final):
+        if not self._failed and self.ws is None:
+            try:
+                self._connect()
+            except Exception as e:
+                logger.error(f"Volc WebSocket connect failed, will use Flash API: {e}")
+                logger.debug(traceback.format_exc())
+                self._failed = True
+
+        audio = self._pending
+        self._drop(len(audio))
+        if len(audio):
+            self._sent.append(audio)
+        if self._failed:
+            if final:
+                self._fallback()
+            return
+
+        try:
+            if len(audio) or final:
+                self.ws.send_binary(build_audio_request(audio.tobytes(), last=final))
+        except Exception as e:
+            logger.error(f"Volc WebSocket send failed: {e}")
+            self._failed = True
+            if final:
+                self._fallback()
+            return
+
+        if final:
+            self._final_event.wait(config.VOLC_WS_FINAL_TIMEOUT)
+            if self._final_text is not None:
+                self._committed.append(self._final_text)
+            elif self._failed:
+                self._fallback()
+            else:
+                logger.warning("Volc WebSocket final result timed out, using last partial result.")
+                self._committed.append(self.partial_text)
+            self._close()
+
+    def _fallback(self):
+        self._close()
+        if self._sent:
+            self._committed.append(self._recognize(np.concatenate(self._sent)))
+
+    def cancel(self):
+        super().cancel()
+        self._close()
+
+    def _close(self):
+        self._closed = True
+        try:
+            if self.ws:
+                self.ws.close()
+        except Exception:
+            pass
@@ -0,0 +1,206 @@
+"""
+One-time Whisper calibration for this machine.
+
+Benchmarks candidate engine configurations (model size, compute type, cpu_threads,
+beam_size, without_timestamps) on a calibration clip and saves the fastest one that
+meets WHISPER_TUNE_TARGET_RTF and WHISPER_TUNE_MIN_ACCURACY to WHISPER_TUNING_FILE.
+WhisperProvider applies that file on load when WHISPER_AUTOTUNE is on and the
+hardware fingerprint still matches.
+
+    python src/main.py --tune-whisper [--clip speech.wav] [--reference "expected text"] [--quick]
+
+The clip defaults to models/calibration.wav (16 kHz mono PCM, ideally 10-30 s of the
+user's own speech); its reference text is read from models/calibration.txt. Without a
+reference, the output of large-v3 at beam 5 is used as the reference. Only multilingual
+models are candidates or references: the distilled large-v3 transcribes English only.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+import traceback
+from src.config import config
+from src.utils.logger import logger
+from src.utils.audio import load_audio, as_float32
+
+MODEL_SIZES = ["small", "base", "medium"]  # Multilingual only; --quick tries the first two
+REFERENCE_MODEL = "large-v3"
+COMPUTE_TYPES = ["int8", "int8_float32"]
+BEAM_SIZES = [1, 5]
+TIMESTAMP_OPTIONS = [True, False]  # without_timestamps
+
+def hardware_fingerprint():
+    return {
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "device": config.DEVICE,
+    }
+
+def thread_options():
+    cores = os.cpu_count() or 4
+    return sorted({max(1, cores // 2), cores})
+
+def char_accuracy(hypothesis, reference):
+    """1 - character error rate, ignoring case, spaces and punctuation."""
+    def normalize(text):
+        return [c for c in text.lower() if c.isalnum()]
+    hyp, ref = normalize(hypothesis), normalize(reference)
+    if not ref:
+        return 1.0 if not hyp else 0.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return max(0.0, 1.0 - previous[-1] / len(ref))
+
+def load_tuning():
+    """The saved tuning for this machine, or None if missing, unreadable or from other hardware."""
+    try:
+        with open(config.WHISPER_TUNING_FILE, "r", encoding="utf-8") as f:
+            tuning = json.load(f)
+        if tuning.get("hardware") != hardware_fingerprint():
+            logger.info("Whisper tuning was calibrated on different hardware; ignoring it.")
+            return None
+        return tuning.get("selected")
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Could not read Whisper tuning: {e}")
+        return None
+
+class WhisperTuner:
+    def __init__(self, samples, reference=None, repeats=2, quick=False):
+        self.audio = as_float32(samples)
+        self.duration = len(samples) / config.SAMPLE_RATE
+        self.reference = reference
+        self.repeats = repeats
+        self.quick = quick
+        self.results = []
+
+    def candidates(self):
+        sizes = MODEL_SIZES[:2] if self.quick else MODEL_SIZES
+        threads = thread_options()[-1:] if self.quick else thread_options()
+        # One model load per (size, compute type, threads); decode options vary per load
+        for size, compute_type, cpu_threads in itertools.product(sizes, COMPUTE_TYPES, threads):
+            yield size, compute_type, cpu_threads
+
+    def _load(self, size, compute_type, cpu_threads):
+        from faster_whisper import WhisperModel
+        from src.services.stt_providers import download_whisper_model
+        return WhisperModel(download_whisper_model(size, config.BASE_DIR), device=config.DEVICE,
+                            compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def _decode(self, model, beam_size, without_timestamps):
+        segments, _ = model.transcribe(self.audio, language=config.LANGUAGE, beam_size=beam_size,
+                                       without_timestamps=without_timestamps, vad_filter=True)
+        return " ".join(s.text for s in segments).strip()
+
+    def _reference_text(self):
+        """Without a reference, trust the biggest model at its most careful settings."""
+        size = REFERENCE_MODEL
+        logger.info(f"No reference text; using {size} (beam 5) output as the reference.")
+        model = self._load(size, "int8_float32", thread_options()[-1])
+        return self._decode(model, beam_size=5, without_timestamps=False)
+
+    def run(self):
+        if self.reference is None:
+            self.reference = self._reference_text()
+        logger.info(f"Calibrating on {self.duration:.1f} s of audio. Reference: {self.reference}")
+
+        for size, compute_type, cpu_threads in self.candidates():
+            try:
+                model = self._load(size, compute_type, cpu_threads)
+                self._decode(model, beam_size=1, without_timestamps=True)  # Lazy init, not measured
+            except Exception as e:
+                logger.warning(f"Skipping {size}/{compute_type}: {e}")
+                continue
+
+            for beam_size, without_timestamps in itertools.product(BEAM_SIZES, TIMESTAMP_OPTIONS):
+                start = time.perf_counter()
+                for _ in range(self.repeats):
+                    text = self._decode(model, beam_size, without_timestamps)
+                elapsed = (time.perf_counter() - start) / self.repeats
+                result = {
+                    "model_size": size,
+                    "compute_type": compute_type,
+                    "cpu_threads": cpu_threads,
+                    "beam_size": beam_size,
+                    "without_timestamps": without_timestamps,
+                    "rtf": elapsed / self.duration,
+                    "accuracy": char_accuracy(text, self.reference),
+                }
+                self.results.append(result)
+                logger.info(f"{size} {compute_type} threads={cpu_threads} beam={beam_size} "
+                            f"no_ts={without_timestamps}: RTF {result['rtf']:.3f}, "
+                            f"accuracy {result['accuracy']:.3f}")
+            del model
+        return self.select()
+
+    def select(self):
+        """Fastest candidate meeting both targets; otherwise the most accurate one within the RTF target, or the fastest."""
+        if not self.results:
+            return None
+        passing = [r for r in self.results
+                   if r["rtf"] <= config.WHISPER_TUNE_TARGET_RTF and r["accuracy"] >= config.WHISPER_TUNE_MIN_ACCURACY]
+        if passing:
+            return min(passing, key=lambda r: r["rtf"])
+        logger.warning("No configuration met both the RTF and accuracy targets.")
+        fast_enough = [r for r in self.results if r["rtf"] <= config.WHISPER_TUNE_TARGET_RTF]
+        if fast_enough:
+            return max(fast_enough, key=lambda r: (r["accuracy"], -r["rtf"]))
+        return min(self.results, key=lambda r: r["rtf"])
+
+    def save(self, selected, path=None):
+        path = path or config.WHISPER_TUNING_FILE
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "hardware": hardware_fingerprint(),
+                "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "clip_seconds": self.duration,
+                "reference": self.reference,
+                "targets": {"rtf": config.WHISPER_TUNE_TARGET_RTF, "accuracy": config.WHISPER_TUNE_MIN_ACCURACY},
+                "selected": selected,
+                "results": self.results,
+            }, f, ensure_ascii=False, indent=2)
+        logger.info(f"Whisper tuning saved to {path}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate Whisper settings for this machine")
+    parser.add_argument("--clip", default=os.path.join(config.BASE_DIR, "models", "calibration.wav"))
+    parser.add_argument("--reference", help="Expected transcript (default: <clip>.txt if present)")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--quick", action="store_true", help="Fewer model sizes and thread counts")
+    args, _ = parser.parse_known_args(argv)
+
+    if not os.path.exists(args.clip):
+        logger.error(f"Calibration clip not found: {args.clip} (record 10-30 s of speech as 16 kHz mono WAV)")
+        return 1
+    reference = args.reference
+    reference_path = os.path.splitext(args.clip)[0] + ".txt"
+    if reference is None and os.path.exists(reference_path):
+        with open(reference_path, "r", encoding="utf-8") as f:
+            reference = f.read().strip()
+
+    try:
+        tuner = WhisperTuner(load_audio(args.clip), reference, repeats=args.repeats, quick=args.quick)
+        selected = tuner.run()
+    except Exception as e:
+        logger.error(f"Whisper calibration failed: {e}")
+        logger.debug(traceback.format_exc())
+        return 1
+    if not selected:
+        logger.error("No Whisper configuration could be loaded.")
+        return 1
+    tuner.save(selected)
+    logger.info(f"Selected: {selected}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,7 @@ Standardized version with clean imports.
 import sys
 from PyQt5.QtWidgets import QWidget, QApplication
 from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QPainter, QColor, QFont
+from PyQt5.QtGui import QPainter, QColor, QFont, QFontMetrics
 from src.utils.logger import logger
 
 class ListeningBar(QWidget):
@@ -14,6 +14,9 @@ class ListeningBar(QWidget):
         self.audio_levels = [0.05] * 50
         self.max_levels = 50
         self.is_recording = False
+        self.partial_text = ""
+        # Repaint only when levels or text changed since the last frame
+        self._dirty = False
         self._setup_ui()
         
     def _setup_ui(self):
@@ -34,9 +37,14 @@ class ListeningBar(QWidget):
         y = screen.height() - self.bar_height - 80
         self.move(x, y)
         
+        self.label_font = QFont('Segoe UI', 10, QFont.Bold)
         self.timer = QTimer()
-        self.timer.timeout.connect(self.update)
-        self.timer.start(30)
+        self.timer.timeout.connect(self._on_frame)
+
+    def _on_frame(self):
+        if self._dirty:
+            self._dirty = False
+            self.update()
     
     def paintEvent(self, event):
         if not self.isVisible():
@@ -49,8 +57,14 @@ class ListeningBar(QWidget):
         painter.drawRoundedRect(0, 0, self.bar_width, self.bar_height, 10, 10)
         
         painter.setPen(QColor(233, 69, 96))
-        painter.setFont(QFont('Segoe UI', 10, QFont.Bold))
-        painter.drawText(0, 5, self.bar_width, 25, Qt.AlignCenter, "🎤 Listening...")
+        painter.setFont(self.label_font)
+        if self.partial_text:
+            # Keep the most recent words visible
+            label = QFontMetrics(self.label_font).elidedText(self.partial_text, Qt.ElideLeft, self.bar_width - 30)
+            painter.setPen(QColor(230, 230, 240))
+        else:
+            label = "🎤 Listening..."
+        painter.drawText(0, 5, self.bar_width, 25, Qt.AlignCenter, label)
         
         margin = 25
         usable_width = self.bar_width - 2 * margin
@@ -67,6 +81,9 @@ class ListeningBar(QWidget):
 
     def show_bar(self):
         self.audio_levels = [0.05] * self.max_levels
+        self.partial_text = ""
+        self._dirty = True
+        self.timer.start(30)
         # Show window without activating it (keeping focus on the previous app)
         self.show()
         # On macOS, raise_() might still steal focus, let's be careful
@@ -74,9 +91,16 @@ class ListeningBar(QWidget):
             self.raise_()
 
     def hide_bar(self):
+        self.timer.stop()
         self.hide()
 
     def update_audio_level(self, level):
         self.audio_levels.append(level)
         if len(self.audio_levels) > self.max_levels:
             self.audio_levels.pop(0)
+        self._dirty = True
+
+    def update_partial_text(self, text):
+        if text != self.partial_text:
+            self.partial_text = text
+            self._dirty = True
@@ -4,17 +4,23 @@ Standardized version with clean imports and error handling.
 """
 import sys
 import os
-from PyQt5.QtWidgets import QSystemTrayIcon, QMenu, QAction, QApplication
+import html
+from PyQt5.QtWidgets import QSystemTrayIcon, QMenu, QAction, QApplication, QMessageBox
 from PyQt5.QtGui import QIcon, QPainter, QColor, QPixmap
 from PyQt5.QtCore import Qt
 from src.utils.startup_manager import StartupManager
 from src.utils.logger import logger
+from src.utils.tracing import tracer
+from src.config import config
+from src.services.engine_lifecycle import LOADING, WARMING, DEGRADED
 
 class TrayIcon:
     def __init__(self, hotkey_manager, listening_bar):
         self.hotkey_manager = hotkey_manager
         self.listening_bar = listening_bar
         self.tray_icon = QSystemTrayIcon()
+        self.recording = False
+        self.engine_state = LOADING
         self._setup_ui()
         
     def _create_pixmap(self, recording=False):
@@ -26,6 +32,10 @@ class TrayIcon:
         
         if recording:
             bg_color = QColor(220, 50, 50)  # Red
+        elif self.engine_state in (LOADING, WARMING):
+            bg_color = QColor(150, 150, 150)  # Gray
+        elif self.engine_state == DEGRADED:
+            bg_color = QColor(230, 150, 40)  # Orange
         else:
             bg_color = QColor(50, 150, 250)  # Blue
             
@@ -58,6 +68,10 @@ class TrayIcon:
         startup_action.setChecked(StartupManager.is_enabled())
         startup_action.triggered.connect(self._toggle_startup)
         menu.addAction(startup_action)
+
+        latency_action = QAction("Latency Report...", menu)
+        latency_action.triggered.connect(self._show_latency_report)
+        menu.addAction(latency_action)
         
         menu.addSeparator()
         exit_action = QAction("Exit", menu)
@@ -73,13 +87,35 @@ class TrayIcon:
         else:
             StartupManager.disable()
 
+    def _show_latency_report(self):
+        report = tracer.format_summary()
+        logger.info(f"Latency report:\n{report}")
+        box = QMessageBox()
+        box.setWindowTitle("AIInput - Latency")
+        box.setTextFormat(Qt.RichText)
+        box.setText(f"<pre>{html.escape(report)}</pre>")
+        if config.TRACE_ENABLED:
+            box.setInformativeText(html.escape(f"Per-utterance traces: {config.TRACE_FILE}"))
+        box.exec_()
+
     def update_status(self, recording=False):
+        self.recording = recording
         self.tray_icon.setIcon(QIcon(self._create_pixmap(recording)))
         if recording:
             self.tray_icon.setToolTip("AIInput (Recording...)")
+        elif self.engine_state == LOADING:
+            self.tray_icon.setToolTip("AIInput - Loading speech model...")
+        elif self.engine_state == WARMING:
+            self.tray_icon.setToolTip("AIInput - Warming up speech model...")
+        elif self.engine_state == DEGRADED:
+            self.tray_icon.setToolTip("AIInput - Speech engine degraded (see app.log)")
         else:
             self.tray_icon.setToolTip("AIInput - Voice Input (Ctrl+Win)")
 
+    def update_engine_state(self, state):
+        self.engine_state = state
+        self.update_status(self.recording)
+
     def _on_exit(self):
         logger.info("Application exiting via tray menu.")
         self.hotkey_manager.stop_listening()
@@ -0,0 +1,100 @@
+import io
+import struct
+import wave
+import numpy as np
+from src.config import config
+from src.utils.logger import logger
+
+def load_audio(audio):
+    """
+    Normalize an audio input to a 1-D int16 sample array.
+    Accepts a WAV file path, WAV bytes, or a NumPy int16/float32 array (returned
+    as-is for int16, so a view over the recorder's buffer stays zero-copy).
+    """
+    if isinstance(audio, np.ndarray):
+        if audio.dtype == np.int16:
+            return audio
+        return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        audio = io.BytesIO(audio)
+    with wave.open(audio, 'rb') as wf:
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+def as_float32(audio):
+    """Return [-1, 1] float32 samples; float32 input is passed through without copying."""
+    if isinstance(audio, np.ndarray) and audio.dtype == np.float32:
+        return audio
+    return int16_to_float32(load_audio(audio))
+
+def int16_to_float32(samples):
+    """Convert int16 samples to the [-1, 1] float32 range expected by Whisper."""
+    return samples.astype(np.float32) / 32768.0
+
+def wav_header(data_size, sample_rate=None, channels=None):
+    """
+    Build a 54-byte PCM16 WAV header for `data_size` bytes of samples.
+    A 2-byte JUNK chunk pads it to a multiple of 3 so the header and the sample
+    buffer can be base64-encoded separately and simply concatenated.
+    """
+    sample_rate = sample_rate or config.SAMPLE_RATE
+    channels = channels or config.CHANNELS
+    block_align = channels * 2
+    return b''.join([
+        struct.pack('<4sI4s', b'RIFF', 46 + data_size, b'WAVE'),
+        struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, channels, sample_rate,
+                    sample_rate * block_align, block_align, 16),
+        struct.pack('<4sI2s', b'JUNK', 2, b'\x00\x00'),
+        struct.pack('<4sI', b'data', data_size),
+    ])
+
+def encode_audio(samples, codec="wav", sample_rate=None):
+    """
+    Encode int16 samples for upload.
+    Returns (format, buffers): the concatenation of `buffers` is the encoded file.
+    "wav" is zero-copy (header + a view of the samples); "flac" and "ogg_opus" are
+    encoded in memory with soundfile (libsndfile). Falls back to WAV if unavailable.
+    """
+    sample_rate = sample_rate or config.SAMPLE_RATE
+    if codec in ("flac", "ogg_opus"):
+        try:
+            import soundfile
+            out = io.BytesIO()
+            if codec == "flac":
+                soundfile.write(out, samples, sample_rate, format="FLAC", subtype="PCM_16")
+                return "flac", [out.getbuffer()]
+            soundfile.write(out, samples, sample_rate, format="OGG", subtype="OPUS")
+            return "ogg", [out.getbuffer()]
+        except Exception as e:
+            logger.warning(f"Could not encode audio as {codec} ({e}), uploading WAV instead.")
+    return "wav", [wav_header(samples.nbytes, sample_rate), memoryview(samples).cast('B')]
+
+def save_wav(samples, path, sample_rate=None, channels=None):
+    """Write an int16 sample array to a WAV file."""
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels or config.CHANNELS)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate or config.SAMPLE_RATE)
+        wf.writeframes(memoryview(samples).cast('B'))
+
+def warmup_audio(seconds=1.0, sample_rate=None):
+    """Deterministic voiced-sounding int16 audio for warm-up inference (never shown to the user)."""
+    sample_rate = sample_rate or config.SAMPLE_RATE
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = np.sin(2 * np.pi * 180 * t) + 0.4 * np.sin(2 * np.pi * 720 * t)
+    noise = np.random.default_rng(0).normal(0, 0.02, len(t))
+    return ((0.2 * tone * (np.sin(2 * np.pi * 4 * t) > 0) + noise) * 32767).astype(np.int16)
+
+def find_quiet_split(samples, start, end, frame_size=1600):
+    """
+    Return the sample index at the center of the quietest frame in samples[start:end].
+    Used to cut segments at natural pauses instead of mid-word.
+    """
+    start = max(0, start)
+    end = min(len(samples), end)
+    n_frames = (end - start) // frame_size
+    if n_frames <= 0:
+        return end
+    frames = samples[start:start + n_frames * frame_size].reshape(n_frames, frame_size)
+    energy = np.abs(frames.astype(np.int32)).sum(axis=1)
+    quietest = int(np.argmin(energy))
+    return start + quietest * frame_size + frame_size // 2
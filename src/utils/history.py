@@ -0,0 +1,25 @@
+"""
+Dictation history: corrections from the cascade's accurate tier, appended to
+HISTORY_FILE as JSON lines, whether or not they replaced the injected text.
+"""
+import json
+import time
+import threading
+from src.config import config
+from src.utils.logger import logger
+
+_lock = threading.Lock()
+
+def record_correction(injected, corrected, applied):
+    entry = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "injected": injected,
+        "corrected": corrected,
+        "applied": applied,
+    }
+    with _lock:
+        try:
+            with open(config.HISTORY_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logger.warning(f"Could not write history: {e}")
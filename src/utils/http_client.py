@@ -0,0 +1,138 @@
+"""
+Shared pooled HTTP client.
+One keep-alive requests.Session for all outgoing calls (Volcengine, Ollama), with
+retries/backoff, per-endpoint timeouts, connection pre-warming, and timing that
+separates TCP/TLS connect time from server time.
+"""
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from src.config import config
+from src.utils.logger import logger
+from src.utils.scheduling import apply_role, BACKGROUND
+
+# Connect time spent by the current thread's request
+_timing = threading.local()
+
+def _record_connect(seconds):
+    _timing.connect = getattr(_timing, "connect", 0.0) + seconds
+    _timing.connects = getattr(_timing, "connects", 0) + 1
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # Includes the TLS handshake
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record_connect(time.perf_counter() - start)
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class _TimedAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.connect_time = 0.0
+        self.server_time = 0.0
+
+    def as_dict(self):
+        n = max(1, self.requests)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "avg_connect_ms": self.connect_time / n * 1000,
+            "avg_server_ms": self.server_time / n * 1000,
+        }
+
+class HttpClient:
+    def __init__(self):
+        self.session = requests.Session()
+        retry = Retry(
+            total=config.HTTP_RETRIES,
+            connect=config.HTTP_RETRIES,
+            read=0,  # Never re-send after the server started working on a request
+            status=config.HTTP_RETRIES,
+            backoff_factor=config.HTTP_BACKOFF,
+            status_forcelist=(429, 502, 503, 504),
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        adapter = _TimedAdapter(pool_connections=config.HTTP_POOL_SIZE,
+                                pool_maxsize=config.HTTP_POOL_SIZE, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def timeout_for(self, endpoint):
+        return config.HTTP_TIMEOUTS.get(endpoint, config.HTTP_TIMEOUTS["default"])
+
+    def request(self, method, url, endpoint="default", **kwargs):
+        """
+        Send a request through the shared pool. The response carries
+        `connect_time` and `server_time` (seconds) for latency metrics.
+        """
+        kwargs.setdefault("timeout", self.timeout_for(endpoint))
+        _timing.connect = 0.0
+        _timing.connects = 0
+        start = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        total = time.perf_counter() - start
+
+        response.connect_time = _timing.connect
+        response.server_time = max(0.0, total - _timing.connect)
+        with self._stats_lock:
+            stats = self.stats.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.new_connections += _timing.connects
+            stats.connect_time += response.connect_time
+            stats.server_time += response.server_time
+        logger.debug(f"HTTP {method} [{endpoint}] {response.status_code}: "
+                     f"connect {response.connect_time * 1000:.0f} ms, server {response.server_time * 1000:.0f} ms")
+        return response
+
+    def post(self, url, endpoint="default", **kwargs):
+        return self.request("POST", url, endpoint, **kwargs)
+
+    def prewarm(self, url):
+        """
+        Open (or refresh) a pooled keep-alive connection to `url`'s host in the
+        background, so the real request skips the TCP connect and TLS handshake.
+        """
+        if not config.HTTP_PREWARM or not url:
+            return
+        threading.Thread(target=self._prewarm, args=(url,), daemon=True).start()
+
+    def _prewarm(self, url):
+        apply_role(BACKGROUND)
+        try:
+            self.session.head(url, timeout=self.timeout_for("prewarm"), allow_redirects=False)
+        except Exception as e:
+            logger.debug(f"Connection pre-warm to {url} failed: {e}")
+
+http_client = HttpClient()
@@ -0,0 +1,99 @@
+"""
+Opt-in import-time profiler, like `python -X importtime` but kept by the app.
+A meta-path finder wraps each module's loader and times its execution, so the
+report shows where startup time goes (self time and cumulative time per module).
+Enable with the AIINPUT_IMPORT_PROFILE=1 environment variable or --import-profile;
+it only sees imports made after install(), so main.py installs it first thing.
+"""
+import os
+import sys
+import time
+import threading
+
+class _TimingLoader:
+    """Delegates to the real loader, timing exec_module."""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profiler._enter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__)
+
+class ImportProfiler:
+    def __init__(self):
+        self.records = []  # (module, self seconds, cumulative seconds, thread name)
+        self.started_at = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                find = getattr(finder, "find_spec", None)
+                if finder is self or find is None:
+                    continue
+                spec = find(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimingLoader(spec.loader, self)
+        return spec
+
+    def _enter(self):
+        stack = self._local.__dict__.setdefault("stack", [])
+        # [start time, time spent in nested imports]
+        stack.append([time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        stack = self._local.stack
+        start, nested = stack.pop()
+        cumulative = time.perf_counter() - start
+        if stack:
+            stack[-1][1] += cumulative
+        with self._lock:
+            self.records.append((name, cumulative - nested, cumulative, threading.current_thread().name))
+
+    def report(self, top=15):
+        with self._lock:
+            records = list(self.records)
+        main_thread = threading.main_thread().name
+        total = sum(r[1] for r in records if r[3] == main_thread)
+        lines = [f"Imports: {len(records)} modules, {total * 1000:.0f} ms on the main thread "
+                 f"(top {top} by cumulative time)",
+                 f"{'cumul ms':>9} {'self ms':>8}  module [thread]"]
+        for name, self_time, cumulative, thread in sorted(records, key=lambda r: -r[2])[:top]:
+            lines.append(f"{cumulative * 1000:>9.1f} {self_time * 1000:>8.1f}  {name} [{thread}]")
+        return "\n".join(lines)
+
+def profiling_requested(argv=None):
+    argv = sys.argv if argv is None else argv
+    return os.getenv("AIINPUT_IMPORT_PROFILE") == "1" or "--import-profile" in argv
+
+profiler = ImportProfiler().install() if profiling_requested() else None
@@ -0,0 +1,121 @@
+"""
+Thread scheduling policy: OS priority and CPU affinity per thread role.
+Capture and hotkey threads run at raised priority so chunks and key releases are
+handled on time while a model is decoding; inference threads run at lowered priority,
+pinned to INFERENCE_CORES; background I/O threads may run on any core.
+Each thread applies its role itself (apply_role is cheap to call repeatedly). Every
+thread we start needs one: on Linux a new thread inherits its creator's policy, so one
+started from the hotkey callback would otherwise stay on the reserved cores. Native
+thread pools (CTranslate2, ONNX Runtime) inherit the role of the thread that creates
+them on Linux only; the transcription server applies the inference policy to its
+whole process, which covers them on every platform.
+Raising priority may need privileges on Linux/macOS; failures are logged and ignored.
+That includes resetting a BACKGROUND thread to nice 0: unprivileged, a helper started
+from an inference thread (the LLM request thread, a Volc reader started from a session)
+keeps that thread's nice 10 and only gets its affinity widened. They are I/O-bound and
+waited on by that same inference thread, so this costs nothing in practice.
+"""
+import os
+import sys
+import threading
+from src.config import config
+from src.utils.logger import logger
+
+CAPTURE = "capture"
+HOTKEY = "hotkey"
+UI = "ui"
+INFERENCE = "inference"
+BACKGROUND = "background"  # Network readers and helpers: any core, nice 0 if permitted (see above)
+
+# Windows SetThreadPriority levels
+_WIN_PRIORITY = {CAPTURE: 15, HOTKEY: 2, UI: 1, INFERENCE: -1, BACKGROUND: 0}  # Time critical ... below normal, normal
+_WIN_BELOW_NORMAL_CLASS = 0x00004000
+# POSIX nice values (per thread on Linux)
+_NICE = {CAPTURE: -10, HOTKEY: -5, UI: 0, INFERENCE: 10, BACKGROUND: 0}
+
+_applied = threading.local()
+
+def inference_cores():
+    """Cores inference may use: INFERENCE_CORES, or all but the first RESERVED_CORES."""
+    if config.INFERENCE_CORES:
+        return sorted(config.INFERENCE_CORES)
+    count = os.cpu_count() or 1
+    if count <= 2:
+        return None  # Too few cores to set any aside
+    return list(range(config.RESERVED_CORES, count))
+
+def reserved_cores():
+    cores = inference_cores()
+    if not cores:
+        return None
+    return [c for c in range(os.cpu_count() or 1) if c not in cores] or None
+
+def apply_role(role):
+    """Apply `role`'s priority and affinity to the calling thread (once per thread)."""
+    if not config.SCHEDULING_ENABLED or getattr(_applied, "role", None) == role:
+        return
+    _applied.role = role
+    cores = _role_cores(role)
+    try:
+        if sys.platform == 'win32':
+            _apply_windows_thread(role, cores)
+        else:
+            _apply_posix_thread(role, cores)
+        logger.debug(f"Thread {threading.current_thread().name}: {role} policy applied (cores {cores or 'any'}).")
+    except Exception as e:
+        logger.debug(f"Could not apply {role} policy to {threading.current_thread().name}: {e}")
+
+def apply_process_role(role):
+    """Apply `role` to the whole process, including threads created by native libraries."""
+    if not config.SCHEDULING_ENABLED:
+        return
+    cores = inference_cores() if role == INFERENCE else None
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            process = kernel32.GetCurrentProcess()
+            if role == INFERENCE:
+                kernel32.SetPriorityClass(process, _WIN_BELOW_NORMAL_CLASS)
+            if cores:
+                kernel32.SetProcessAffinityMask(process, ctypes.c_size_t(_mask(cores)))
+        else:
+            if cores and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, cores)
+            os.setpriority(os.PRIO_PROCESS, 0, _NICE[role])
+        logger.info(f"Process scheduling: {role} policy applied (cores {cores or 'any'}).")
+    except Exception as e:
+        logger.warning(f"Could not apply {role} policy to the process: {e}")
+
+def _role_cores(role):
+    if role == INFERENCE:
+        return inference_cores()
+    if role in (CAPTURE, HOTKEY):
+        return reserved_cores()
+    if role == BACKGROUND:
+        # Explicitly all cores: undo an affinity inherited from the creating thread
+        return list(range(os.cpu_count() or 1))
+    return None
+
+def _mask(cores):
+    return sum(1 << c for c in cores if c < 64)
+
+def _apply_windows_thread(role, cores):
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    thread = kernel32.GetCurrentThread()
+    kernel32.SetThreadPriority(thread, _WIN_PRIORITY[role])
+    if cores:
+        kernel32.SetThreadAffinityMask(thread, ctypes.c_size_t(_mask(cores)))
+
+def _apply_posix_thread(role, cores):
+    # On Linux, pid 0 / the native thread id address the calling thread only
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    if sys.platform.startswith('linux'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), _NICE[role])
+        except PermissionError:
+            # Unprivileged: raising priority fails, lowering still works. A BACKGROUND thread
+            # created by an INFERENCE thread therefore stays at nice 10.
+            logger.debug(f"No permission to set nice {_NICE[role]} for {role} thread.")
@@ -0,0 +1,152 @@
+"""
+Per-utterance latency tracing.
+Each dictation gets an UtteranceTrace that collects monotonic timestamps as it moves
+through the pipeline (hotkey press ... paste, clipboard restore). Finished traces are
+appended to TRACE_FILE as JSON lines and kept in memory for the p50/p95/p99 summary.
+Once TRACE_FILE exceeds TRACE_MAX_BYTES it is moved to TRACE_FILE + ".1" (replacing
+the previous one), so at most about twice that is kept on disk.
+"""
+import os
+import json
+import math
+import time
+import itertools
+import threading
+from collections import deque
+from src.config import config
+from src.utils.logger import logger
+
+# Stage marks, in pipeline order
+STAGES = [
+    "hotkey_press", "stream_open", "first_chunk", "release", "wav_saved",
+    "stt_start", "stt_end", "refine_start", "refine_end", "paste", "clipboard_restore",
+]
+
+# Summary intervals: (label, from mark, to mark)
+INTERVALS = [
+    ("press -> stream open", "hotkey_press", "stream_open"),
+    ("press -> first chunk", "hotkey_press", "first_chunk"),
+    ("release -> wav saved", "release", "wav_saved"),
+    ("release -> stt start", "release", "stt_start"),
+    ("stt", "stt_start", "stt_end"),
+    ("refine", "refine_start", "refine_end"),
+    ("refine end -> paste", "refine_end", "paste"),
+    ("paste -> clipboard restore", "paste", "clipboard_restore"),
+    ("release -> paste (end to end)", "release", "paste"),
+]
+
+class UtteranceTrace:
+    def __init__(self, tracer, trace_id):
+        self.tracer = tracer
+        self.id = trace_id
+        self.marks = {}
+        self.info = {}
+        self.finished = False
+
+    def mark(self, stage):
+        """Record the first time `stage` is reached (monotonic seconds)."""
+        if stage not in self.marks:
+            self.marks[stage] = time.perf_counter()
+
+    def annotate(self, **info):
+        self.info.update(info)
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self.tracer._record(self)
+
+    def as_dict(self):
+        origin = self.marks.get("hotkey_press", min(self.marks.values(), default=0.0))
+        return {
+            "id": self.id,
+            "wall_time": time.time(),
+            # Milliseconds since the hotkey press
+            "marks": {stage: round((t - origin) * 1000, 2) for stage, t in self.marks.items()},
+            **self.info,
+        }
+
+class Tracer:
+    def __init__(self, path=None, keep=None):
+        self.path = path
+        self.recent = deque(maxlen=keep or config.TRACE_KEEP)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self):
+        trace = UtteranceTrace(self, next(self._ids))
+        trace.mark("hotkey_press")
+        return trace
+
+    def _record(self, trace):
+        record = trace.as_dict()
+        with self._lock:
+            self.recent.append(record)
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        size = f.tell()
+                    if size > config.TRACE_MAX_BYTES:
+                        os.replace(self.path, self.path + ".1")
+                except Exception as e:
+                    logger.warning(f"Could not write trace: {e}")
+        logger.debug(f"Trace {trace.id}: {record['marks']}")
+
+    def summary(self):
+        """{interval label: {"count", "p50", "p95", "p99"}} in milliseconds over recent traces."""
+        with self._lock:
+            records = list(self.recent)
+        result = {}
+        for label, start, end in INTERVALS:
+            values = sorted(r["marks"][end] - r["marks"][start] for r in records
+                            if start in r["marks"] and end in r["marks"])
+            if values:
+                result[label] = {
+                    "count": len(values),
+                    "p50": percentile(values, 50),
+                    "p95": percentile(values, 95),
+                    "p99": percentile(values, 99),
+                }
+        return result
+
+    def format_summary(self):
+        summary = self.summary()
+        if not summary:
+            return "No dictations traced yet."
+        lines = [f"{'stage':<30} {'n':>4} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)"]
+        for label, s in summary.items():
+            lines.append(f"{label:<30} {s['count']:>4} {s['p50']:>8.1f} {s['p95']:>8.1f} {s['p99']:>8.1f}")
+        with self._lock:
+            captured = [r for r in self.recent if "capture_frames" in r]
+        if captured:
+            total = {key: sum(r[f"capture_{key}"] for r in captured)
+                     for key in ("frames", "dropped_frames", "late_frames", "overflows")}
+            lines.append(f"Capture: {total['dropped_frames']} dropped, {total['late_frames']} late of "
+                         f"{total['frames']} frames ({total['overflows']} overflows) in {len(captured)} dictations")
+        return "\n".join(lines)
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, max(0, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class _NullTrace:
+    """Stand-in used when tracing is disabled, so call sites never check."""
+    id = None
+
+    def mark(self, stage):
+        pass
+
+    def annotate(self, **info):
+        pass
+
+    def finish(self):
+        pass
+
+NULL_TRACE = _NullTrace()
+
+tracer = Tracer(config.TRACE_FILE if config.TRACE_ENABLED else None)
+
+def start_trace():
+    return tracer.start() if config.TRACE_ENABLED else NULL_TRACE
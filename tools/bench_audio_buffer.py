@@ -0,0 +1,115 @@
+"""
+Micro-benchmark: per-chunk cost of the recorder's frame store.
+
+Compares the previous design (list of bytes + np.frombuffer/abs/mean under a lock,
+b''.join at stop) with the shipped capture path: AudioRecorder._on_audio copies each
+chunk into a preallocated slot, _drain moves it into an AudioRingBuffer and computes
+the level in a scratch buffer, and stop takes a zero-copy view. Both halves run on
+this thread, so the figure is the work per chunk without the thread handoff.
+
+Usage: python tools/bench_audio_buffer.py [--seconds 30] [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import tracemalloc
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import numpy as np
+from src.config import config
+from src.services.audio_buffer import AudioRingBuffer
+from src.services.audio_recorder import AudioRecorder
+
+def make_chunks(seconds):
+    rng = np.random.default_rng(0)
+    n_chunks = int(seconds * config.SAMPLE_RATE / config.CHUNK_SIZE)
+    return [rng.integers(-3000, 3000, config.CHUNK_SIZE, dtype=np.int16).tobytes() for _ in range(n_chunks)]
+
+class ListStore:
+    """The previous recorder design."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = []
+
+    def feed(self, data):
+        with self.lock:
+            self.frames.append(data)
+            audio_data = np.frombuffer(data, dtype=np.int16)
+            return min(1.0, np.abs(audio_data).mean() / 32768.0 * 30)
+
+    def finish(self):
+        return np.frombuffer(b''.join(self.frames), dtype=np.int16)
+
+class RecorderStore:
+    """AudioRecorder's callback (_on_audio) and consumer (_drain), as shipped."""
+    def __init__(self):
+        self.recorder = AudioRecorder(on_audio_level=lambda level: None)  # No stream is opened
+        self.recorder.is_recording = True
+
+    def feed(self, data):
+        self.recorder._on_audio(data, config.CHUNK_SIZE, None, 0)
+        self.recorder._drain()
+
+    def finish(self):
+        return self.recorder.buffer.view()
+
+def check_fixed_ring():
+    """Regression check: a chunk longer than a fixed ring must leave it in order."""
+    ring = AudioRingBuffer(5, growable=False)
+    ring.write(np.arange(2, dtype=np.int16))
+    ring.write(np.arange(10, 16, dtype=np.int16))
+    assert ring.view().tolist() == [11, 12, 13, 14, 15], ring.view().tolist()
+    ring.write(np.array([16, 17], dtype=np.int16))
+    assert ring.view().tolist() == [13, 14, 15, 16, 17], ring.view().tolist()
+
+def measure(store_cls, chunks, repeat):
+    # Timing pass (without tracemalloc overhead)
+    best = float("inf")
+    for _ in range(repeat):
+        store = store_cls()
+        start = time.perf_counter()
+        for data in chunks:
+            store.feed(data)
+        store.finish()
+        best = min(best, time.perf_counter() - start)
+
+    # Allocation pass: transient bytes per chunk, retained bytes, and the cost of finish()
+    store = store_cls()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    transient = 0
+    for data in chunks:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        store.feed(data)
+        transient += tracemalloc.get_traced_memory()[1] - current
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.reset_peak()
+    store.finish()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return best, transient, retained, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    check_fixed_ring()
+    config.ALWAYS_ON_CAPTURE = False  # Keep AudioRecorder from opening the microphone
+    chunks = make_chunks(args.seconds)
+    n = len(chunks)
+    print(f"{n} chunks of {config.CHUNK_SIZE} samples ({args.seconds:.0f}s of audio)\n")
+    print(f"{'store':<12}{'us/chunk':>10}{'B/chunk':>10}{'retained KiB':>14}{'peak at stop KiB':>18}")
+    for name, store_cls in (("list+join", ListStore), ("recorder", RecorderStore)):
+        best, transient, retained, peak = measure(store_cls, chunks, args.repeat)
+        print(f"{name:<12}{best / n * 1e6:>10.2f}{transient / n:>10.0f}{retained / 1024:>14.1f}{peak / 1024:>18.1f}")
+
+if __name__ == "__main__":
+    main()
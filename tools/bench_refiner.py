@@ -0,0 +1,86 @@
+"""
+Benchmark: rule-based refiner vs. the LLM refiner on tools/refiner_corpus.jsonl.
+
+Reports exact-match rate, mean character similarity to the expected output, and
+per-call latency (p50/p95) for each engine. By default the LLM path runs against
+the Ollama stand-in in tools/mock_servers.py, which echoes its input after
+--llm-latency-ms, so its quality numbers only mean "unchanged text"; pass
+--llm-url http://localhost:11434/api/generate to score a real model.
+
+Usage: python tools/bench_refiner.py [--llm-url URL] [--llm-latency-ms 800] [--repeat 200]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import difflib
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.config import config
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "refiner_corpus.jsonl")
+
+def load_corpus(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def evaluate(name, refiner, corpus, repeat, show_misses=False):
+    latencies = []
+    exact = 0
+    similarity = 0.0
+    for item in corpus:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = refiner.refine(item["input"])
+            latencies.append(time.perf_counter() - start)
+        exact += output == item["expected"]
+        similarity += difflib.SequenceMatcher(None, output, item["expected"]).ratio()
+        if show_misses and output != item["expected"]:
+            print(f"    miss: {item['input']} -> {output} (expected {item['expected']})")
+
+    n = len(corpus)
+    print(f"{name:<8} exact {exact}/{n} ({exact / n:.0%})  similarity {similarity / n:.3f}  "
+          f"p50 {percentile(latencies, 50) * 1e6:,.1f} us  p95 {percentile(latencies, 95) * 1e6:,.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--llm-url", help="Real Ollama /api/generate endpoint (default: local mock)")
+    parser.add_argument("--llm-latency-ms", type=int, default=800, help="Mock time-to-first-token")
+    parser.add_argument("--repeat", type=int, default=200, help="Rule engine calls per sentence")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    print(f"{len(corpus)} sentences from {args.corpus}")
+
+    # Measure each engine on its own: no caches, no local pre-pass, no latency budget
+    config.CACHE_ENABLED = False
+    config.LLM_ENABLED = True
+    config.LLM_LOCAL_FILTER = False
+    config.LLM_LATENCY_BUDGET_MS = 0
+
+    server = None
+    if args.llm_url:
+        config.LLM_API_URL = args.llm_url
+    else:
+        from tools.mock_servers import start_mock_server
+        server, _ = start_mock_server(latency_ms=args.llm_latency_ms, token_ms=10)
+        config.LLM_API_URL = f"http://127.0.0.1:{server.server_address[1]}/api/generate"
+
+    from src.services.llm_refiner import LLMRefiner, RuleBasedRefiner
+    evaluate("rules", RuleBasedRefiner(), corpus, args.repeat, args.show_misses)
+    evaluate("llm", LLMRefiner(), corpus, 1, args.show_misses)
+    if server:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
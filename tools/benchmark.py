@@ -0,0 +1,244 @@
+"""
+Headless end-to-end benchmark: no microphone, hotkey or live services.
+
+Each WAV in the corpus is fed chunk by chunk through a fake recorder into the same
+path the hotkey uses (streaming session or whole clip -> Transcriber -> refiner ->
+injector), with a no-op injector at the end. Volcengine Flash/WebSocket and Ollama
+are served by tools/mock_servers.py on localhost.
+
+Reports, per provider/config: RTF (processing time after release / audio length),
+release-to-paste latency p50/p95/p99, throughput (audio seconds per wall second),
+CPU time and peak RSS (process-wide, so later runs include earlier peaks).
+
+    python tools/benchmark.py --corpus path/to/wavs --providers volcengine,sensevoice
+    python tools/benchmark.py --synthetic 10 --configs stream,batch --refiner llm --json out.json
+
+--realtime paces the fake recorder at the microphone's rate, so streaming sessions
+see audio the way they would live; otherwise chunks are pushed as fast as possible.
+"""
+import os
+import sys
+import json
+import time
+import wave
+import glob
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import numpy as np
+from src.config import config
+from src.utils.tracing import Tracer, percentile as nearest_rank
+
+CONFIGS = {
+    # name: config overrides
+    "stream": {"STREAMING_ENABLED": True},
+    "batch": {"STREAMING_ENABLED": False},
+}
+
+def read_wav(path):
+    """Load a WAV as 16 kHz mono int16 (downmixed / linearly resampled if needed)."""
+    with wave.open(path, "rb") as wf:
+        rate, channels, width = wf.getframerate(), wf.getnchannels(), wf.getsampwidth()
+        data = wf.readframes(wf.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM is supported")
+    samples = np.frombuffer(data, dtype=np.int16).astype(np.float32)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != config.SAMPLE_RATE:
+        n_out = int(len(samples) * config.SAMPLE_RATE / rate)
+        samples = np.interp(np.linspace(0, len(samples) - 1, n_out), np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+def synthetic_corpus(count, seconds=4.0):
+    """Syllable-like tone bursts with pauses; enough for VAD and for timing the pipeline."""
+    rng = np.random.default_rng(0)
+    corpus = []
+    for i in range(count):
+        n = int(seconds * config.SAMPLE_RATE)
+        t = np.arange(n) / config.SAMPLE_RATE
+        envelope = (np.sin(2 * np.pi * 3 * t) > -0.2).astype(np.float32) * (t > 0.3) * (t < seconds - 0.3)
+        voice = np.sin(2 * np.pi * (150 + 20 * i) * t) + 0.5 * np.sin(2 * np.pi * 600 * t)
+        samples = 6000 * envelope * voice + rng.normal(0, 60, n)
+        corpus.append((f"synthetic_{i:02d}", samples.astype(np.int16)))
+    return corpus
+
+class FakeRecorder:
+    """Plays a sample array into an AudioRingBuffer and an on_chunk consumer, like AudioRecorder."""
+
+    def __init__(self, realtime=False):
+        self.realtime = realtime
+
+    def record(self, samples, on_chunk=None, trace=None):
+        from src.services.audio_buffer import AudioRingBuffer
+        buffer = AudioRingBuffer(config.SAMPLE_RATE * config.RECORD_BUFFER_SECONDS)
+        chunk_seconds = config.CHUNK_SIZE / config.SAMPLE_RATE
+        start = time.perf_counter()
+        if trace:
+            trace.mark("stream_open")  # The real recorder marks this once its input stream is open
+        for i, offset in enumerate(range(0, len(samples), config.CHUNK_SIZE)):
+            if self.realtime:
+                delay = start + i * chunk_seconds - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            written = buffer.write(samples[offset:offset + config.CHUNK_SIZE])
+            if trace:
+                trace.mark("first_chunk")
+            if on_chunk:
+                on_chunk(written)
+        return buffer.view()
+
+class NullInjector:
+    """Drops the text; only records the paste mark."""
+
+    def __init__(self):
+        self.texts = []
+
+    def type_text(self, text, trace=None):
+        self.texts.append(text)
+        if trace:
+            trace.mark("paste")
+            trace.finish()
+
+def percentile(values, p):
+    return nearest_rank(sorted(values), p) if values else 0.0
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        try:
+            import psutil
+            info = psutil.Process().memory_info()
+            return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+        except ImportError:
+            return float("nan")
+
+def run(provider, config_name, corpus, refiner_engine, realtime, repeat):
+    from src.services.transcriber import Transcriber
+    from src.services.llm_refiner import create_refiner
+
+    config.STT_PROVIDER = provider
+    for key, value in CONFIGS[config_name].items():
+        setattr(config, key, value)
+    config.LLM_ENABLED = refiner_engine == "llm"
+    config.REFINER_ENGINE = refiner_engine if refiner_engine != "none" else "llm"
+
+    transcriber = Transcriber()
+    if not transcriber.provider:
+        print(f"{provider}/{config_name}: provider unavailable, skipped")
+        return None
+    refiner = create_refiner()
+    recorder = FakeRecorder(realtime)
+    injector = NullInjector()
+    tracer = Tracer()
+
+    # Warm-up pass (model load, first connections) is not measured
+    transcriber.transcribe(corpus[0][1])
+
+    latencies, rtfs = [], []
+    audio_seconds = 0.0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        for name, samples in corpus:
+            trace = tracer.start()
+            session = transcriber.start_stream()
+            audio = recorder.record(samples, session.feed if session else None, trace)
+            trace.mark("release")
+            release = time.perf_counter()
+
+            trace.mark("stt_start")
+            text = transcriber.finish_stream(session, audio) if session else transcriber.transcribe(audio)
+            trace.mark("stt_end")
+            if text:
+                trace.mark("refine_start")
+                text = refiner.refine(text)
+                trace.mark("refine_end")
+            injector.type_text(text, trace)
+
+            elapsed = time.perf_counter() - release
+            duration = len(samples) / config.SAMPLE_RATE
+            latencies.append(elapsed * 1000)
+            rtfs.append(elapsed / duration)
+            audio_seconds += duration
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "provider": provider,
+        "config": config_name,
+        "refiner": refiner_engine,
+        "utterances": len(latencies),
+        "audio_seconds": round(audio_seconds, 2),
+        "rtf_mean": float(np.mean(rtfs)),
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "latency_p99_ms": percentile(latencies, 99),
+        "throughput_x": audio_seconds / wall,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": tracer.summary(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of WAV files")
+    parser.add_argument("--synthetic", type=int, default=8, help="Generated clips when no corpus is given")
+    parser.add_argument("--providers", default="volcengine", help="Comma-separated STT providers")
+    parser.add_argument("--configs", default="stream,batch", help=f"Comma-separated: {', '.join(CONFIGS)}")
+    parser.add_argument("--refiner", choices=["none", "rules", "llm"], default="none")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--realtime", action="store_true", help="Pace the fake recorder at 1x")
+    parser.add_argument("--latency-ms", type=int, default=100, help="Mock server response latency")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.corpus:
+        paths = sorted(glob.glob(os.path.join(args.corpus, "*.wav")))
+        corpus = [(os.path.basename(p), read_wav(p)) for p in paths]
+    else:
+        corpus = synthetic_corpus(args.synthetic)
+    if not corpus:
+        parser.error("empty corpus")
+
+    from tools.mock_servers import start_mock_server
+    server, state = start_mock_server(latency_ms=args.latency_ms)
+    base = f"127.0.0.1:{server.server_address[1]}"
+    config.VOLC_FLASH_URL = f"http://{base}/api/v3/auc/bigmodel/recognize/flash"
+    config.VOLC_WS_URL = f"ws://{base}/api/v3/sauc/bigmodel"
+    config.LLM_API_URL = f"http://{base}/api/generate"
+    config.VOLC_APP_ID = config.VOLC_APP_ID or "benchmark"
+    config.VOLC_ACCESS_KEY = config.VOLC_ACCESS_KEY or "benchmark"
+    # Every pass must do the work; no result caches, no stray files
+    config.CACHE_ENABLED = False
+    config.SAVE_DEBUG_AUDIO = False
+    config.STT_SERVER_ENABLED = False
+
+    results = []
+    for provider in args.providers.split(","):
+        for config_name in args.configs.split(","):
+            result = run(provider.strip(), config_name.strip(), corpus, args.refiner, args.realtime, args.repeat)
+            if result:
+                results.append(result)
+    server.shutdown()
+
+    print(f"\n{len(corpus)} clips, {sum(len(s) for _, s in corpus) / config.SAMPLE_RATE:.1f} s of audio, "
+          f"refiner={args.refiner}, mock latency {args.latency_ms} ms")
+    print(f"{'provider/config':<24} {'RTF':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'thru x':>7} {'CPU s':>7} {'RSS MB':>7}")
+    for r in results:
+        print(f"{r['provider'] + '/' + r['config']:<24} {r['rtf_mean']:>6.3f} {r['latency_p50_ms']:>8.0f} "
+              f"{r['latency_p95_ms']:>8.0f} {r['latency_p99_ms']:>8.0f} {r['throughput_x']:>7.1f} "
+              f"{r['cpu_seconds']:>7.2f} {r['peak_rss_mb']:>7.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
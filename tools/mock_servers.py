@@ -0,0 +1,247 @@
+"""
+Local stand-ins for the remote services used by AIInput, for testing and benchmarks.
+
+    python tools/mock_servers.py [--port 8765] [--latency-ms 0]
+
+Volcengine Flash:  POST http://127.0.0.1:<port>/api/v3/auc/bigmodel/recognize/flash
+    Decodes the base64 audio, records the upload size and codec, and answers with a
+    fixed transcript in the real API's header/JSON shape.
+
+Volcengine streaming:  WebSocket ws://127.0.0.1:<port>/api/v3/sauc/bigmodel
+    Speaks the binary frame protocol from src/services/volc_streaming.py. Every audio
+    packet is answered with a growing partial result; the last packet gets the full
+    transcript with the last-packet flag.
+
+Ollama:  POST http://127.0.0.1:<port>/api/generate
+    Answers with the text after the prompt template (or a fixed refinement), either as
+    one JSON object or, with "stream": true, as NDJSON pieces spaced --token-ms apart.
+
+Point the app at it with
+    VOLC_FLASH_URL = "http://127.0.0.1:8765/api/v3/auc/bigmodel/recognize/flash"
+    VOLC_WS_URL = "ws://127.0.0.1:8765/api/v3/sauc/bigmodel"
+    LLM_API_URL = "http://127.0.0.1:8765/api/generate"
+"""
+import os
+import sys
+import json
+import time
+import base64
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from src.services import volc_streaming as volc
+
+FLASH_PATH = "/api/v3/auc/bigmodel/recognize/flash"
+WS_PATH = "/api/v3/sauc/bigmodel"
+OLLAMA_PATH = "/api/generate"
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class MockState:
+    def __init__(self, transcript="这是一个测试。", latency_ms=0, token_ms=20, refinement=None):
+        self.transcript = transcript
+        self.latency_ms = latency_ms
+        self.token_ms = token_ms
+        self.refinement = refinement
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def record(self, **info):
+        with self.lock:
+            self.requests.append(info)
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(parts)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send_json(self, obj, status=200, headers=None):
+        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == WS_PATH and self.headers.get("Upgrade", "").lower() == "websocket":
+            self._handle_websocket()
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_HEAD(self):
+        # Connection pre-warming
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path == FLASH_PATH:
+            self._handle_flash(body)
+        elif self.path == OLLAMA_PATH:
+            self._handle_ollama(body)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _handle_flash(self, body):
+        payload = json.loads(body)
+        audio = payload.get("audio", {})
+        data = base64.b64decode(audio.get("data", ""))
+        self.state.record(endpoint="flash", format=audio.get("format"),
+                          body_bytes=len(body), audio_bytes=len(data))
+        time.sleep(self.state.latency_ms / 1000)
+        self._send_json(
+            {"result": {"text": self.state.transcript}, "audio_info": {"duration": 0}},
+            headers={"X-Api-Status-Code": "20000000", "X-Api-Message": "OK"}
+        )
+
+    def _handle_ollama(self, body):
+        payload = json.loads(body)
+        prompt = payload.get("prompt", "")
+        # Echo the dictated text, i.e. whatever follows the template's last line
+        text = self.state.refinement if self.state.refinement is not None else prompt.rsplit("：", 1)[-1]
+        self.state.record(endpoint="ollama", stream=bool(payload.get("stream")), prompt_chars=len(prompt))
+        time.sleep(self.state.latency_ms / 1000)
+        if not payload.get("stream"):
+            self._send_json({"model": payload.get("model"), "response": text, "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            pieces = [text[i:i + 2] for i in range(0, len(text), 2)] + [""]
+            for i, piece in enumerate(pieces):
+                done = i == len(pieces) - 1
+                line = json.dumps({"response": piece, "done": done}, ensure_ascii=False).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+                if not done:
+                    time.sleep(self.state.token_ms / 1000)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (latency budget)
+            self.close_connection = True
+
+    # --- Minimal RFC 6455 server side (binary frames only) ---
+
+    def _ws_recv(self):
+        """Return (opcode, payload) for the next client frame."""
+        first, second = self.rfile.read(2)
+        opcode = first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack(">H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack(">Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if second & 0x80 else None
+        payload = self.rfile.read(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return opcode, payload
+
+    def _ws_send(self, payload, opcode=0x2):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack(">BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack(">BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack(">BBQ", 0x80 | opcode, 127, length)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+    def _send_result(self, text, last=False, sequence=1):
+        flags = volc.NEG_SEQUENCE if last else volc.POS_SEQUENCE
+        body = volc.gzip.compress(json.dumps({"result": {"text": text}}, ensure_ascii=False).encode("utf-8"))
+        frame = (volc.build_header(volc.FULL_SERVER_RESPONSE, flags)
+                 + struct.pack(">i", -sequence if last else sequence)
+                 + struct.pack(">I", len(body)) + body)
+        self._ws_send(frame)
+
+    def _handle_websocket(self):
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        self.send_response(101, "Switching Protocols")
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+
+        transcript = self.state.transcript
+        audio_bytes = 0
+        sequence = 0
+        start = time.perf_counter()
+        while True:
+            opcode, payload = self._ws_recv()
+            if opcode == 0x8:  # close
+                self._ws_send(b"", opcode=0x8)
+                break
+            if opcode != 0x2:
+                continue
+            frame = volc.parse_frame(payload)
+            if frame["message_type"] == volc.FULL_CLIENT_REQUEST:
+                continue
+            audio_bytes += len(frame["payload"])
+            sequence += 1
+            if frame["is_last"]:
+                time.sleep(self.state.latency_ms / 1000)
+                self._send_result(transcript, last=True, sequence=sequence)
+                self.state.record(endpoint="websocket", audio_bytes=audio_bytes,
+                                  packets=sequence, seconds=time.perf_counter() - start)
+            else:
+                # Reveal one more character for every ~0.3 s of audio received
+                shown = min(len(transcript), audio_bytes // 9600)
+                self._send_result(transcript[:shown], sequence=sequence)
+        self.close_connection = True
+
+def start_mock_server(port=0, transcript="这是一个测试。", latency_ms=0, token_ms=20, refinement=None):
+    """Start the mock HTTP server on a background thread. Returns (server, state)."""
+    state = MockState(transcript, latency_ms, token_ms, refinement)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--token-ms", type=int, default=20, help="Delay between streamed LLM pieces")
+    args = parser.parse_args()
+    server, state = start_mock_server(args.port, latency_ms=args.latency_ms, token_ms=args.token_ms)
+    print(f"Mock services on http://127.0.0.1:{server.server_address[1]} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()